@@ -0,0 +1,59 @@
+"""Index package search
+
+Revision ID: 0b5e9d3a7c18
+Revises: f2c7b81d5e36
+Create Date: 2024-07-24 16:20:11.357902
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0b5e9d3a7c18"
+down_revision: Union[str, None] = "f2c7b81d5e36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "package",
+        sa.Column(
+            "search",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(short_description, '')), 'B') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_package_search",
+        "package",
+        ["search"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_package_name_trgm",
+        "package",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_package_name_trgm", table_name="package")
+    op.drop_index("ix_package_search", table_name="package")
+    op.drop_column("package", "search")
@@ -0,0 +1,30 @@
+"""Compress uploaded chunks alongside the original
+
+Revision ID: 1c6f8d3b9e40
+Revises: 6e4a9c2d7f38
+Create Date: 2024-08-30 09:41:17.208653
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1c6f8d3b9e40"
+down_revision: Union[str, None] = "6e4a9c2d7f38"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "uploadchunk", sa.Column("compressed", sa.LargeBinary(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("uploadchunk", "compressed")
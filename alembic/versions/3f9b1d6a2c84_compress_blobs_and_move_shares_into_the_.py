@@ -0,0 +1,102 @@
+"""Compress blobs and move shares into the blob store
+
+Revision ID: 3f9b1d6a2c84
+Revises: 7e2a5c9d4b16
+Create Date: 2024-08-14 09:12:37.581204
+
+"""
+
+from typing import Sequence, Union
+import gzip
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9b1d6a2c84"
+down_revision: Union[str, None] = "7e2a5c9d4b16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "blob",
+        sa.Column(
+            "encoding",
+            sqlmodel.sql.sqltypes.AutoString(),
+            server_default="identity",
+            nullable=False,
+        ),
+    )
+    op.add_column("blob", sa.Column("stored_size", sa.Integer(), nullable=True))
+    op.execute("UPDATE blob SET stored_size = size")
+    op.alter_column("blob", "stored_size", nullable=False)
+
+    # Existing shares are moved as they are, new ones are compressed.
+    op.execute(
+        """
+        INSERT INTO blob (digest, size, stored_size, data, created)
+        SELECT DISTINCT
+            encode(sha256(convert_to(data, 'UTF8')), 'hex'),
+            octet_length(data),
+            octet_length(data),
+            convert_to(data, 'UTF8'),
+            CURRENT_TIMESTAMP
+        FROM sharedata
+        ON CONFLICT (digest) DO NOTHING
+        """
+    )
+    op.add_column(
+        "sharedata",
+        sa.Column("data_digest", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.execute(
+        "UPDATE sharedata SET data_digest = encode(sha256(convert_to(data, 'UTF8')), 'hex')"
+    )
+    op.alter_column("sharedata", "data_digest", nullable=False)
+    op.create_foreign_key(
+        "sharedata_data_digest_fkey", "sharedata", "blob", ["data_digest"], ["digest"]
+    )
+    op.drop_column("sharedata", "data")
+
+
+def downgrade() -> None:
+    # Decompress blobs one at a time, as that cannot be done in SQL.
+    connection = op.get_bind()
+    compressed = connection.execute(
+        sa.text("SELECT digest FROM blob WHERE encoding = 'gzip'")
+    ).scalars()
+    for digest in compressed.all():
+        data = connection.execute(
+            sa.text("SELECT data FROM blob WHERE digest = :digest"),
+            {"digest": digest},
+        ).scalar_one()
+        connection.execute(
+            sa.text(
+                "UPDATE blob SET data = :data, encoding = 'identity' WHERE digest = :digest"
+            ),
+            {"data": gzip.decompress(data), "digest": digest},
+        )
+
+    op.add_column(
+        "sharedata",
+        sa.Column("data", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.execute(
+        """
+        UPDATE sharedata
+        SET data = (
+            SELECT convert_from(data, 'UTF8') FROM blob
+            WHERE digest = sharedata.data_digest
+        )
+        """
+    )
+    op.alter_column("sharedata", "data", nullable=False)
+    op.drop_constraint("sharedata_data_digest_fkey", "sharedata", type_="foreignkey")
+    op.drop_column("sharedata", "data_digest")
+
+    op.drop_column("blob", "stored_size")
+    op.drop_column("blob", "encoding")
@@ -0,0 +1,90 @@
+"""Move package payloads into a content-addressed blob table
+
+Revision ID: 5c1f0e8a7d21
+Revises: 322b53bd2dbc
+Create Date: 2024-07-15 10:12:31.418260
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1f0e8a7d21"
+down_revision: Union[str, None] = "322b53bd2dbc"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "blob",
+        sa.Column("digest", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("created", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("digest"),
+    )
+    # Blobs are read back in slices with substring(), which only fetches the
+    # TOAST chunks it needs when the value is stored out of line uncompressed.
+    op.execute("ALTER TABLE blob ALTER COLUMN data SET STORAGE EXTERNAL")
+
+    op.execute(
+        """
+        INSERT INTO blob (digest, size, data, created)
+        SELECT encode(sha256(payload), 'hex'), length(payload), payload, CURRENT_TIMESTAMP
+        FROM (
+            SELECT coalesce(data, '') AS payload FROM package
+            UNION
+            SELECT logo FROM package WHERE logo IS NOT NULL
+        ) AS payloads
+        """
+    )
+
+    op.add_column(
+        "package",
+        sa.Column("data_digest", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.add_column(
+        "package",
+        sa.Column("logo_digest", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.execute(
+        """
+        UPDATE package
+        SET data_digest = encode(sha256(coalesce(data, '')), 'hex'),
+            logo_digest = encode(sha256(logo), 'hex')
+        """
+    )
+    op.alter_column("package", "data_digest", nullable=False)
+    op.create_foreign_key(
+        "package_data_digest_fkey", "package", "blob", ["data_digest"], ["digest"]
+    )
+    op.create_foreign_key(
+        "package_logo_digest_fkey", "package", "blob", ["logo_digest"], ["digest"]
+    )
+
+    op.drop_column("package", "data")
+    op.drop_column("package", "logo")
+
+
+def downgrade() -> None:
+    op.add_column("package", sa.Column("data", sa.LargeBinary(), nullable=True))
+    op.add_column("package", sa.Column("logo", sa.LargeBinary(), nullable=True))
+    op.execute(
+        """
+        UPDATE package
+        SET data = (SELECT data FROM blob WHERE digest = package.data_digest),
+            logo = (SELECT data FROM blob WHERE digest = package.logo_digest)
+        """
+    )
+
+    op.drop_constraint("package_logo_digest_fkey", "package", type_="foreignkey")
+    op.drop_constraint("package_data_digest_fkey", "package", type_="foreignkey")
+    op.drop_column("package", "logo_digest")
+    op.drop_column("package", "data_digest")
+    op.drop_table("blob")
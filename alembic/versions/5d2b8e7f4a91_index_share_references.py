@@ -0,0 +1,30 @@
+"""Index share references
+
+Revision ID: 5d2b8e7f4a91
+Revises: 8c3e6f1a9b52
+Create Date: 2024-08-19 11:05:42.730158
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2b8e7f4a91"
+down_revision: Union[str, None] = "8c3e6f1a9b52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix_sharedata_reference"), "sharedata", ["reference"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_sharedata_reference"), table_name="sharedata")
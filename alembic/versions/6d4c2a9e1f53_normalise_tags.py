@@ -0,0 +1,99 @@
+"""Normalise tags
+
+Revision ID: 6d4c2a9e1f53
+Revises: 0b5e9d3a7c18
+Create Date: 2024-07-29 11:47:30.218664
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6d4c2a9e1f53"
+down_revision: Union[str, None] = "0b5e9d3a7c18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.rename_table("tag", "tag_old")
+    op.execute("ALTER TABLE tag_old RENAME CONSTRAINT tag_pkey TO tag_old_pkey")
+
+    op.create_table(
+        "tag",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("package_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_table(
+        "packagetag",
+        sa.Column("package_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["package_id"], ["package.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["tag_id"],
+            ["tag.id"],
+        ),
+        sa.PrimaryKeyConstraint("package_id", "tag_id"),
+    )
+    op.create_index(
+        op.f("ix_packagetag_tag_id"), "packagetag", ["tag_id"], unique=False
+    )
+
+    op.execute(
+        """
+        INSERT INTO tag (name, package_count)
+        SELECT DISTINCT trim(name), 0 FROM tag_old WHERE trim(name) <> ''
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO packagetag (package_id, tag_id)
+        SELECT DISTINCT tag_old.package_id, tag.id
+        FROM tag_old JOIN tag ON tag.name = trim(tag_old.name)
+        """
+    )
+    op.execute(
+        """
+        UPDATE tag SET package_count = (
+            SELECT count(*)
+            FROM packagetag
+            JOIN latest_package ON latest_package.package_id = packagetag.package_id
+            WHERE packagetag.tag_id = tag.id
+        )
+        """
+    )
+    op.drop_table("tag_old")
+
+
+def downgrade() -> None:
+    op.create_table(
+        "tag_old",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("package_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["package_id"],
+            ["package.id"],
+            name="tag_package_id_fkey",
+        ),
+        sa.PrimaryKeyConstraint("name", "package_id", name="tag_old_pkey"),
+    )
+    op.execute(
+        """
+        INSERT INTO tag_old (name, package_id)
+        SELECT tag.name, packagetag.package_id
+        FROM packagetag JOIN tag ON tag.id = packagetag.tag_id
+        """
+    )
+    op.drop_index(op.f("ix_packagetag_tag_id"), table_name="packagetag")
+    op.drop_table("packagetag")
+    op.drop_table("tag")
+    op.rename_table("tag_old", "tag")
+    op.execute("ALTER TABLE tag RENAME CONSTRAINT tag_old_pkey TO tag_pkey")
@@ -0,0 +1,36 @@
+"""Record the size of sample data
+
+Revision ID: 6e4a9c2d7f38
+Revises: b5e1f3a8c7d2
+Create Date: 2024-08-28 11:06:52.740318
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6e4a9c2d7f38"
+down_revision: Union[str, None] = "b5e1f3a8c7d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("sampledata", sa.Column("size", sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE sampledata SET size = (
+            SELECT size FROM blob WHERE digest = sampledata.data_digest
+        )
+        """
+    )
+    op.alter_column("sampledata", "size", nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("sampledata", "size")
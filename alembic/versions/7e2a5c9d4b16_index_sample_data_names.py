@@ -0,0 +1,28 @@
+"""Index sample data names
+
+Revision ID: 7e2a5c9d4b16
+Revises: d85b3f0c2e71
+Create Date: 2024-08-12 10:31:09.448120
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7e2a5c9d4b16"
+down_revision: Union[str, None] = "d85b3f0c2e71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_sampledata_name"), "sampledata", ["name"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_sampledata_name"), table_name="sampledata")
@@ -0,0 +1,99 @@
+"""Store share payloads as binary
+
+Revision ID: 8c3e6f1a9b52
+Revises: 3f9b1d6a2c84
+Create Date: 2024-08-16 14:47:03.215986
+
+"""
+
+from typing import Sequence, Union
+from hashlib import sha256
+import gzip
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c3e6f1a9b52"
+down_revision: Union[str, None] = "3f9b1d6a2c84"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_UNREFERENCED = """
+    DELETE FROM blob WHERE digest = :digest
+    AND NOT EXISTS (SELECT 1 FROM package WHERE data_digest = :digest OR logo_digest = :digest)
+    AND NOT EXISTS (SELECT 1 FROM sampledata WHERE data_digest = :digest)
+    AND NOT EXISTS (SELECT 1 FROM upload WHERE digest = :digest)
+    AND NOT EXISTS (SELECT 1 FROM sharedata WHERE data_digest = :digest)
+"""
+
+
+def upgrade() -> None:
+    op.add_column("sharedata", sa.Column("size", sa.Integer(), nullable=True))
+
+    # Payloads were hex encoded, and may have been compressed since, which
+    # cannot be undone in SQL: decode them one at a time.
+    connection = op.get_bind()
+    shares = connection.execute(
+        sa.text("SELECT DISTINCT data_digest FROM sharedata")
+    ).scalars()
+    for old in shares.all():
+        (encoding, stored) = connection.execute(
+            sa.text("SELECT encoding, data FROM blob WHERE digest = :digest"),
+            {"digest": old},
+        ).one()
+        if encoding == "gzip":
+            stored = gzip.decompress(stored)
+        data = bytes.fromhex(stored.decode())
+        new = sha256(data).hexdigest()
+        connection.execute(
+            sa.text(
+                """
+                INSERT INTO blob (digest, size, stored_size, data, created)
+                VALUES (:digest, :size, :size, :data, CURRENT_TIMESTAMP)
+                ON CONFLICT (digest) DO NOTHING
+                """
+            ),
+            {"digest": new, "size": len(data), "data": data},
+        )
+        connection.execute(
+            sa.text(
+                "UPDATE sharedata SET data_digest = :new, size = :size WHERE data_digest = :old"
+            ),
+            {"new": new, "size": len(data), "old": old},
+        )
+        connection.execute(sa.text(_UNREFERENCED), {"digest": old})
+
+    op.alter_column("sharedata", "size", nullable=False)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    shares = connection.execute(
+        sa.text("SELECT DISTINCT data_digest FROM sharedata")
+    ).scalars()
+    for old in shares.all():
+        data = connection.execute(
+            sa.text("SELECT data FROM blob WHERE digest = :digest"), {"digest": old}
+        ).scalar_one()
+        encoded = data.hex().encode()
+        new = sha256(encoded).hexdigest()
+        connection.execute(
+            sa.text(
+                """
+                INSERT INTO blob (digest, size, stored_size, data, created)
+                VALUES (:digest, :size, :size, :data, CURRENT_TIMESTAMP)
+                ON CONFLICT (digest) DO NOTHING
+                """
+            ),
+            {"digest": new, "size": len(encoded), "data": encoded},
+        )
+        connection.execute(
+            sa.text("UPDATE sharedata SET data_digest = :new WHERE data_digest = :old"),
+            {"new": new, "old": old},
+        )
+        connection.execute(sa.text(_UNREFERENCED), {"digest": old})
+
+    op.drop_column("sharedata", "size")
@@ -0,0 +1,28 @@
+"""Index login tokens
+
+Revision ID: 9a8f4e21c6d0
+Revises: 6d4c2a9e1f53
+Create Date: 2024-08-01 09:12:54.733018
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9a8f4e21c6d0"
+down_revision: Union[str, None] = "6d4c2a9e1f53"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_usertoken_token"), "usertoken", ["token"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_usertoken_token"), table_name="usertoken")
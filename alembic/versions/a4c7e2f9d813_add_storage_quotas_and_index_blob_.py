@@ -0,0 +1,41 @@
+"""Add storage quotas and index blob references
+
+Revision ID: a4c7e2f9d813
+Revises: 5d2b8e7f4a91
+Create Date: 2024-08-21 16:22:58.104377
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c7e2f9d813"
+down_revision: Union[str, None] = "5d2b8e7f4a91"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns referring to blobs, which are looked up when vacuuming blobs.
+_REFERENCES = (
+    ("package", "data_digest"),
+    ("package", "logo_digest"),
+    ("sampledata", "data_digest"),
+    ("sharedata", "data_digest"),
+    ("upload", "digest"),
+)
+
+
+def upgrade() -> None:
+    op.add_column("user", sa.Column("storage_quota", sa.BigInteger(), nullable=True))
+    for table, column in _REFERENCES:
+        op.create_index(op.f(f"ix_{table}_{column}"), table, [column], unique=False)
+
+
+def downgrade() -> None:
+    for table, column in _REFERENCES:
+        op.drop_index(op.f(f"ix_{table}_{column}"), table_name=table)
+    op.drop_column("user", "storage_quota")
@@ -0,0 +1,36 @@
+"""Add logo thumbnails
+
+Revision ID: b5e1f3a8c7d2
+Revises: a4c7e2f9d813
+Create Date: 2024-08-26 10:48:15.362091
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e1f3a8c7d2"
+down_revision: Union[str, None] = "a4c7e2f9d813"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Thumbnails of existing logos are made when they are first requested.
+    op.create_table(
+        "logo_thumbnail",
+        sa.Column("digest", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("mime", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(["digest"], ["blob.digest"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("digest"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("logo_thumbnail")
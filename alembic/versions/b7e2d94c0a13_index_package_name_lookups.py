@@ -0,0 +1,35 @@
+"""Index package name lookups
+
+Revision ID: b7e2d94c0a13
+Revises: 5c1f0e8a7d21
+Create Date: 2024-07-16 09:41:05.277315
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e2d94c0a13"
+down_revision: Union[str, None] = "5c1f0e8a7d21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_user_username"), "user", ["username"], unique=False)
+    op.create_index(
+        "ix_package_owner_id_name_version",
+        "package",
+        ["owner_id", "name", "version"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_package_owner_id_name_version", table_name="package")
+    op.drop_index(op.f("ix_user_username"), table_name="user")
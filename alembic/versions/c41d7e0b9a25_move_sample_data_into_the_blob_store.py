@@ -0,0 +1,57 @@
+"""Move sample data into the blob store
+
+Revision ID: c41d7e0b9a25
+Revises: 9a8f4e21c6d0
+Create Date: 2024-08-05 13:28:16.094477
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41d7e0b9a25"
+down_revision: Union[str, None] = "9a8f4e21c6d0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        INSERT INTO blob (digest, size, data, created)
+        SELECT DISTINCT encode(sha256(data), 'hex'), length(data), data, CURRENT_TIMESTAMP
+        FROM sampledata
+        ON CONFLICT (digest) DO NOTHING
+        """
+    )
+
+    op.add_column(
+        "sampledata",
+        sa.Column("data_digest", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.execute("UPDATE sampledata SET data_digest = encode(sha256(data), 'hex')")
+    op.alter_column("sampledata", "data_digest", nullable=False)
+    op.create_foreign_key(
+        "sampledata_data_digest_fkey", "sampledata", "blob", ["data_digest"], ["digest"]
+    )
+
+    op.drop_column("sampledata", "data")
+
+
+def downgrade() -> None:
+    op.add_column("sampledata", sa.Column("data", sa.LargeBinary(), nullable=True))
+    op.execute(
+        """
+        UPDATE sampledata
+        SET data = (SELECT data FROM blob WHERE digest = sampledata.data_digest)
+        """
+    )
+    op.alter_column("sampledata", "data", nullable=False)
+
+    op.drop_constraint("sampledata_data_digest_fkey", "sampledata", type_="foreignkey")
+    op.drop_column("sampledata", "data_digest")
@@ -0,0 +1,33 @@
+"""Index the package listing order
+
+Revision ID: e3a1f6c92b47
+Revises: b7e2d94c0a13
+Create Date: 2024-07-18 14:12:37.904551
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a1f6c92b47"
+down_revision: Union[str, None] = "b7e2d94c0a13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_package_name_owner_id_version",
+        "package",
+        ["name", "owner_id", "version"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_package_name_owner_id_version", table_name="package")
@@ -0,0 +1,58 @@
+"""Add a latest_package projection
+
+Revision ID: f2c7b81d5e36
+Revises: e3a1f6c92b47
+Create Date: 2024-07-22 10:05:48.615230
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c7b81d5e36"
+down_revision: Union[str, None] = "e3a1f6c92b47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "latest_package",
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("package_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["owner_id"],
+            ["user.id"],
+        ),
+        sa.ForeignKeyConstraint(["package_id"], ["package.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("name", "owner_id"),
+        sa.UniqueConstraint("package_id"),
+    )
+    # Rebuild the projection from the existing packages.
+    op.execute(
+        """
+        INSERT INTO latest_package (name, owner_id, package_id, version)
+        SELECT DISTINCT ON (name, owner_id) name, owner_id, id, version
+        FROM package
+        ORDER BY name, owner_id, version DESC
+        """
+    )
+    # Listings are now ordered by the projection's primary key.
+    op.drop_index("ix_package_name_owner_id_version", table_name="package")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_package_name_owner_id_version",
+        "package",
+        ["name", "owner_id", "version"],
+        unique=False,
+    )
+    op.drop_table("latest_package")
@@ -0,0 +1,244 @@
+"""Statistical analysis of benchmark results.
+
+Timings are summarised by their median, with a bootstrap confidence interval,
+as they are skewed by the occasional slow run. Ratios of medians, such as how
+many times slower WASM is than native, get their intervals from resampling
+both sets of timings independently.
+
+    python analysis.py summary [DATA]
+    python analysis.py compare BASELINE CANDIDATE [--machine wasm32]
+
+`compare` compares the timings of every benchmark, parameter and machine two
+result sets have in common, each a results file or a directory of them. It
+exits with status 1 when any got slower by more than the threshold with
+confidence, e.g. after upgrading Pyodide, or 2 when they have none in common.
+It exits with status 3 when none got slower but some could not be compared,
+as timings too coarse to divide by cannot show a regression either. The
+confidence level is divided among the comparisons (Bonferroni), so that
+running many of them does not flag regressions by chance.
+"""
+
+from pathlib import Path
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from plot import WASM, load_results
+
+# The columns telling a set of timings apart.
+KEY = ["language", "benchmark", "parameter", "machine"]
+
+RESAMPLES = 10_000
+CONFIDENCE = 0.95
+# Slowdown of the candidate tolerated before it is a regression.
+THRESHOLD = 0.05
+
+
+def load(path: Path) -> pd.DataFrame:
+    """Read a results file, or every results file in a directory."""
+    results = load_results(path) if path.is_dir() else pd.read_csv(path)
+    # Parameters are compared as text, however each file was parsed.
+    return results.assign(parameter=results["parameter"].astype(str))
+
+
+def bootstrap_medians(
+    seconds: np.ndarray, rng: np.random.Generator, resamples: int = RESAMPLES
+) -> np.ndarray:
+    """The medians of resamples, with replacement, of some timings."""
+    samples = rng.integers(0, len(seconds), size=(resamples, len(seconds)))
+    return np.median(seconds[samples], axis=1)
+
+
+def interval(estimates: np.ndarray, confidence: float) -> tuple[float, float]:
+    """The percentile interval of bootstrap estimates at a confidence level."""
+    alpha = 1 - confidence
+    (low, high) = np.quantile(estimates, [alpha / 2, 1 - alpha / 2])
+    return (float(low), float(high))
+
+
+def ratio_interval(
+    numerator: np.ndarray,
+    denominator: np.ndarray,
+    rng: np.random.Generator,
+    confidence: float = CONFIDENCE,
+    resamples: int = RESAMPLES,
+) -> tuple[float, float, float]:
+    """The ratio of the medians of two sets of timings, with its interval.
+
+    The interval is NaN when the denominator's timings are too coarse to
+    divide by, as when a browser's timer rounds them to zero.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.median(numerator) / np.median(denominator)
+        ratios = bootstrap_medians(numerator, rng, resamples) / bootstrap_medians(
+            denominator, rng, resamples
+        )
+    if not np.isfinite(ratios).all():
+        return (float(ratio), np.nan, np.nan)
+    return (float(ratio), *interval(ratios, confidence))
+
+
+def summary(
+    results: pd.DataFrame,
+    rng: np.random.Generator,
+    confidence: float = CONFIDENCE,
+    resamples: int = RESAMPLES,
+) -> pd.DataFrame:
+    """The median of each set of timings, with its confidence interval."""
+    rows = []
+    for key, timings in results.groupby(KEY, sort=True):
+        seconds = timings["seconds"].to_numpy()
+        (low, high) = interval(bootstrap_medians(seconds, rng, resamples), confidence)
+        rows.append(
+            dict(zip(KEY, key))
+            | {"runs": len(seconds), "median": np.median(seconds)}
+            | {"ci_low": low, "ci_high": high}
+        )
+    return pd.DataFrame(rows)
+
+
+def slowdowns(
+    results: pd.DataFrame,
+    rng: np.random.Generator,
+    confidence: float = CONFIDENCE,
+    resamples: int = RESAMPLES,
+) -> pd.DataFrame:
+    """How many times slower WASM is than each native machine, per parameter."""
+    rows = []
+    group = ["language", "benchmark", "parameter"]
+    for key, timings in results.groupby(group, sort=True):
+        wasm = timings[timings["machine"] == WASM]["seconds"].to_numpy()
+        if len(wasm) == 0:
+            continue
+        for machine, native in timings[timings["machine"] != WASM].groupby("machine"):
+            (ratio, low, high) = ratio_interval(
+                wasm, native["seconds"].to_numpy(), rng, confidence, resamples
+            )
+            rows.append(
+                dict(zip(group, key))
+                | {"native": machine, "slowdown": ratio}
+                | {"ci_low": low, "ci_high": high}
+            )
+    return pd.DataFrame(rows)
+
+
+def compare(
+    baseline: pd.DataFrame,
+    candidate: pd.DataFrame,
+    rng: np.random.Generator,
+    threshold: float = THRESHOLD,
+    confidence: float = CONFIDENCE,
+    resamples: int = RESAMPLES,
+) -> pd.DataFrame:
+    """Compare the timings of a candidate to a baseline's.
+
+    `ratio` is the candidate's median over the baseline's: a regression is a
+    ratio whose whole interval is above 1 + threshold, an improvement one whose
+    whole interval is below 1 / (1 + threshold).
+    """
+    before = dict(list(baseline.groupby(KEY, sort=True)))
+    after = dict(list(candidate.groupby(KEY, sort=True)))
+    common = [key for key in before if key in after]
+    if not common:
+        return pd.DataFrame(columns=KEY + ["ratio", "ci_low", "ci_high", "verdict"])
+
+    # Bonferroni correction for the number of comparisons.
+    corrected = 1 - (1 - confidence) / len(common)
+    rows = []
+    for key in common:
+        (ratio, low, high) = ratio_interval(
+            after[key]["seconds"].to_numpy(),
+            before[key]["seconds"].to_numpy(),
+            rng,
+            corrected,
+            resamples,
+        )
+        if np.isnan(low):
+            verdict = "unresolved"
+        elif low > 1 + threshold:
+            verdict = "regression"
+        elif high < 1 / (1 + threshold):
+            verdict = "improvement"
+        else:
+            verdict = "unchanged"
+        rows.append(
+            dict(zip(KEY, key))
+            | {
+                "baseline": before[key]["seconds"].median(),
+                "candidate": after[key]["seconds"].median(),
+                "ratio": ratio,
+                "ci_low": low,
+                "ci_high": high,
+                "verdict": verdict,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def _print(table: pd.DataFrame) -> None:
+    print(table.to_string(index=False, float_format="{:.4g}".format))
+
+
+def main(argv=None) -> int:
+    """Run the command line, returning the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--resamples", type=int, default=RESAMPLES)
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+    summarise = commands.add_parser("summary", help="Medians and WASM slowdowns")
+    summarise.add_argument("data", type=Path, nargs="?", default=Path("data"))
+    comparison = commands.add_parser("compare", help="Detect regressions")
+    comparison.add_argument("baseline", type=Path)
+    comparison.add_argument("candidate", type=Path)
+    comparison.add_argument("--threshold", type=float, default=THRESHOLD)
+    comparison.add_argument(
+        "--machine", action="append", help="Only compare these machines"
+    )
+    args = parser.parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+
+    if args.command == "summary":
+        results = load(args.data)
+        _print(summary(results, rng, args.confidence, args.resamples))
+        if not (
+            table := slowdowns(results, rng, args.confidence, args.resamples)
+        ).empty:
+            print()
+            _print(table)
+        return 0
+
+    (baseline, candidate) = (load(args.baseline), load(args.candidate))
+    if args.machine is not None:
+        baseline = baseline[baseline["machine"].isin(args.machine)]
+        candidate = candidate[candidate["machine"].isin(args.machine)]
+    table = compare(
+        baseline, candidate, rng, args.threshold, args.confidence, args.resamples
+    )
+    if table.empty:
+        print("No benchmarks in common", file=sys.stderr)
+        return 2
+    _print(table)
+    regressions = table[table["verdict"] == "regression"]
+    unresolved = table[table["verdict"] == "unresolved"]
+    if not (regressions.empty and unresolved.empty):
+        print(file=sys.stderr)
+    if not regressions.empty:
+        print(f"{len(regressions)} regression(s)", file=sys.stderr)
+    if not unresolved.empty:
+        print(
+            f"{len(unresolved)} unresolved, timings too coarse to compare:",
+            file=sys.stderr,
+        )
+        print(unresolved[KEY].to_string(index=False), file=sys.stderr)
+    if not regressions.empty:
+        return 1
+    if not unresolved.empty:
+        return 3
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
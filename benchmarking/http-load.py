@@ -0,0 +1,299 @@
+"""Load test of the JINet HTTP endpoints.
+
+The app is served in this process through httpx's ASGI transport, against
+the Postgres database configured by DATABASE_URI, so that the queries each
+request makes can be counted on the app's engine. The app's lifespan is not
+run, leaving the maintenance jobs out of the measurements.
+
+A user, packages, a sample data file and a share are published through the
+app itself before each run. Every endpoint is then requested by concurrent
+clients, after a few warm up requests. Latencies are written as
+HTTP-<machine>.csv, in the tidy format of registry.py with the endpoint as the
+parameter, for plot.py, and are summarised with the throughput and queries
+per request as HTTP-summary-<machine>.csv.
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+import argparse
+import asyncio
+import base64
+import csv
+import json
+import os
+import secrets
+import statistics
+import time
+
+import httpx
+from itsdangerous import TimestampSigner
+from sqlalchemy import event
+from sqlmodel import func, select
+
+from jinet.config import settings
+from jinet.db import async_session, engine
+from jinet.js import SCRIPT_VERSION
+from jinet.main import app
+from jinet.models import Package, User, UserToken
+import registry
+
+
+@dataclass(frozen=True)
+class Profile:
+    """How hard to load the server: `requests` per endpoint, `concurrency`
+    clients at a time, with `packages` published in the catalog."""
+
+    requests: int
+    concurrency: int
+    packages: int
+    warmup: int = 10
+
+
+PROFILES = {
+    "smoke": Profile(requests=50, concurrency=1, packages=3, warmup=2),
+    "steady": Profile(requests=1000, concurrency=8, packages=30),
+    "burst": Profile(requests=2000, concurrency=64, packages=30),
+}
+
+USERNAME = "benchmark"
+
+PACKAGE_SOURCE = b"def main(size: int):\n    return sum(range(size))\n" * 40
+SAMPLE_DATA = b"x,y\n" + b"".join(b"%d,%d\n" % (i, i * i) for i in range(20_000))
+SHARE_DATA = os.urandom(256 * 1024)
+
+
+class QueryCounter:
+    """Count the statements the app's engine executes."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._executed)
+
+    def _executed(self, *unused):
+        self.count += 1
+
+
+def session_cookie(token: str) -> str:
+    """A session cookie logging in with a token, as SessionMiddleware signs it."""
+    data = base64.b64encode(json.dumps({"token": token}).encode())
+    return TimestampSigner(str(settings.secret_key)).sign(data).decode()
+
+
+async def login() -> str:
+    """Make sure the benchmark user exists and return a new login token for it."""
+    async with async_session() as session:
+        query = select(User).where(User.username == USERNAME)
+        if (user := (await session.exec(query)).one_or_none()) is None:
+            user = User(
+                username=USERNAME,
+                role="user",
+                can_upload=True,
+                picture="",
+                sub=f"benchmark|{USERNAME}",
+            )
+            session.add(user)
+            await session.flush()
+        token = UserToken(token=secrets.token_urlsafe(32), user_id=user.id)
+        session.add(token)
+        await session.commit()
+        return token.token
+
+
+def check(response: httpx.Response) -> httpx.Response:
+    """Fail on an error, which the app reports as an alert in a 200 response."""
+    response.raise_for_status()
+    if b"uk-alert-danger" in response.content[:200]:
+        raise RuntimeError(f"{response.request.url}: {response.text}")
+    return response
+
+
+async def publish(client: httpx.AsyncClient, profile: Profile) -> dict[str, str]:
+    """Publish what the endpoints serve and return the URL of each endpoint."""
+    for number in range(profile.packages):
+        check(
+            await client.post(
+                "/packages/validate",
+                data={
+                    "runtime": "python-runtime",
+                    "package-name": f"load-test-{number}",
+                    "parameters": "[]",
+                    "output": "output-html",
+                    "package-tags": "benchmark, load-test",
+                    "package-headline": "A package published by the load test",
+                },
+                files={
+                    "package-file": ("main.py", PACKAGE_SOURCE, "text/x-python"),
+                },
+            )
+        )
+
+    async with async_session() as session:
+        query = select(func.max(Package.version)).where(Package.name == "load-test-0")
+        version = (await session.exec(query)).one()
+    package = f"{USERNAME}/load-test-0@{version}"
+
+    sample = f"load-test-{secrets.token_hex(4)}.csv"
+    check(
+        await client.post(
+            "/data/new",
+            files={"file-data": (sample, SAMPLE_DATA, "text/csv")},
+        )
+    )
+
+    shared = check(
+        await client.post(
+            f"/share?application={package}",
+            data={"output-type": "output-html", "checksum": "00"},
+            files={"output-data": ("result", SHARE_DATA, "application/octet-stream")},
+        )
+    )
+    reference = shared.text.split("/shared/", 1)[1].split('"')[0]
+
+    return {
+        "packages-list": "/packages/list",
+        "packages-run": f"/packages/run?package={package}",
+        "packages-file": f"/packages/file?package={package}",
+        "js": f"/js/ui-python.js?application={package}&v={SCRIPT_VERSION}",
+        "data-file": f"/data/file?name={sample}",
+        "shared": f"/shared/{reference}",
+    }
+
+
+async def load(
+    client: httpx.AsyncClient, url: str, profile: Profile, queries: QueryCounter
+) -> dict:
+    """Request a URL as the profile says and summarise the latencies."""
+    for _ in range(profile.warmup):
+        check(await client.get(url))
+
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(profile.requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                check(await client.get(url))
+            except (httpx.HTTPError, RuntimeError):
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    queries.count = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(profile.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": profile.requests,
+        "concurrency": profile.concurrency,
+        "errors": errors,
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+        "p99": quantiles[98],
+        "throughput": profile.requests / elapsed,
+        "queries_per_request": queries.count / profile.requests,
+        "latencies": latencies,
+    }
+
+
+def write_results(
+    results: dict[str, dict], profile: str, machine: str
+) -> tuple[str, str]:
+    """Write the latencies and the summary of each endpoint, return the filenames."""
+    context = registry.environment() | {"language": "HTTP", "machine": machine}
+    latency_file = registry.write_results(
+        [
+            {
+                "benchmark": "http-load",
+                "title": f"HTTP load test, {profile} profile",
+                "parameter_name": "Endpoint",
+                "parameter": endpoint,
+                "run": run_number,
+                "seconds": seconds,
+            }
+            | context
+            for endpoint, result in results.items()
+            for run_number, seconds in enumerate(result["latencies"])
+        ],
+        f"HTTP-{machine}.csv",
+    )
+
+    summary_file = f"HTTP-summary-{machine}.csv"
+    fields = [
+        "endpoint",
+        "requests",
+        "concurrency",
+        "errors",
+        "p50",
+        "p95",
+        "p99",
+        "throughput",
+        "queries_per_request",
+    ]
+    with open(summary_file, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for endpoint, result in results.items():
+            writer.writerow({"endpoint": endpoint} | result)
+
+    return (latency_file, summary_file)
+
+
+async def run(profile: Profile, endpoints: Callable[[str], bool]) -> dict[str, dict]:
+    """Publish the test data, then load each selected endpoint in turn."""
+    queries = QueryCounter()
+    token = await login()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://benchmark",
+        cookies={"session": session_cookie(token)},
+        timeout=None,
+    ) as client:
+        urls = await publish(client, profile)
+        results = {}
+        for endpoint, url in urls.items():
+            if not endpoints(endpoint):
+                continue
+            print(f"Loading {endpoint}...", end="", flush=True)
+            results[endpoint] = await load(client, url, profile, queries)
+            print("[DONE]")
+    await engine.dispose()
+    return results
+
+
+def main():
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=PROFILES, default="steady")
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        help="Only load these endpoints, may be repeated",
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run(
+            PROFILES[args.profile],
+            lambda endpoint: args.endpoint is None or endpoint in args.endpoint,
+        )
+    )
+    for endpoint, result in results.items():
+        print(
+            f"{endpoint:>14}: p50 {result['p50'] * 1000:8.2f} ms"
+            f"  p95 {result['p95'] * 1000:8.2f} ms"
+            f"  p99 {result['p99'] * 1000:8.2f} ms"
+            f"  {result['throughput']:8.1f} req/s"
+            f"  {result['queries_per_request']:5.2f} queries/req"
+            f"  {result['errors']} errors"
+        )
+    return write_results(results, args.profile, registry.machine())
+
+
+# Run from the repository root, against a database migrated to the latest
+# revision, with: PYTHONPATH=. DATABASE_URI=... python benchmarking/http-load.py
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
-"""Plot the performance data."""
+"""Plot the performance data and tabulate how much slower WASM is than native.
+
+Results are read from every CSV file in the data directory, in the tidy
+format written by registry.py and registry.R: a row per timed run of a
+benchmark for a parameter value, on some machine.
+"""
 
 from pathlib import Path
 
@@ -7,83 +12,94 @@ import pandas as pd
 
 FONTSIZE = 12
 
+# The machine WASM results are recorded for.
+WASM = "wasm32"
 
-def main():
-    for datafile in Path("data").iterdir():
-        data = pd.read_csv(datafile)
-        fig = plt.figure()
-        data.boxplot()
-        plt.title(datafile.stem)
-        fig.savefig(f"{datafile.stem}.svg", format="svg")
-
-
-def R_plot(benchmark, title, xlabel):
-    wasm32 = pd.read_csv(f"data/R-{benchmark}-wasm32.csv")
-    wasm32 = wasm32[wasm32 > 0]
-    x86 = pd.read_csv(f"data/R-{benchmark}-x86_64.csv")
-    y_max = max(wasm32.max().max(), x86.max().max())
-    y_min = min(wasm32.min().min(), x86.min().min())
-    fig, ax = plt.subplots(nrows=1, ncols=2, figsize=(12, 6))
-
-    wasm32.boxplot(ax=ax[0])
-    x86.boxplot(ax=ax[1])
-    ax[0].set_title("WASM32")
-    ax[0].set_ylim([y_min, y_max])
-    ax[0].set_ylabel("Time (seconds)", fontsize=FONTSIZE)
-    ax[0].set_xlabel(xlabel, fontsize=FONTSIZE)
-    ax[0].set_yscale("log")
-    ax[0].tick_params(labelsize=FONTSIZE)
-    ax[1].set_title("x86_64 Native")
-    ax[1].set_ylim([y_min, y_max])
-    ax[1].set_xlabel(xlabel, fontsize=FONTSIZE)
-    ax[1].set_yscale("log")
-    ax[1].tick_params(axis='x', labelsize=FONTSIZE)
-    ax[1].tick_params(axis='y', which='both', length=0)
-    ax[1].set_yticklabels([])
 
-    plt.tight_layout()
-    fig.suptitle(title, fontsize=16)
-    fig.savefig(f"R-{benchmark}.png", format="png")
-
-
-def python_plot(benchmark, title, xlabel):
-    wasm32 = pd.read_csv(f"data/Python-{benchmark}-wasm32.csv")
-    x86 = pd.read_csv(f"data/Python-{benchmark}-x86_64.csv")
-    y_max = max(wasm32.max().max(), x86.max().max())
-    y_min = min(wasm32.min().min(), x86.min().min())
-    fig, ax = plt.subplots(nrows=1, ncols=2, figsize=(12, 6))
-
-    wasm32.boxplot(ax=ax[0])
-    x86.boxplot(ax=ax[1])
-    ax[0].set_title("WASM32")
-    ax[0].set_ylim([y_min, y_max])
-    ax[0].set_ylabel("Time (seconds)", fontsize=FONTSIZE)
-    ax[0].set_xlabel(xlabel, fontsize=FONTSIZE)
-    ax[0].set_yscale("log")
-    ax[0].tick_params(labelsize=FONTSIZE)
-    ax[1].set_title("x86_64 Native")
-    ax[1].set_ylim([y_min, y_max])
-    ax[1].set_yticklabels([])
-    ax[1].set_xlabel(xlabel, fontsize=FONTSIZE)
-    ax[1].set_yscale("log")
-    ax[1].tick_params(axis='x', labelsize=FONTSIZE)
-    ax[1].tick_params(axis='y', which='both', length=0)
-    ax[1].set_yticklabels([])
+def load_results(directory: Path = Path("data")) -> pd.DataFrame:
+    """Read every results file in a directory into one table."""
+    return pd.concat(
+        (pd.read_csv(datafile) for datafile in sorted(Path(directory).glob("*.csv"))),
+        ignore_index=True,
+    )
 
-    plt.tight_layout()
-    fig.suptitle(title, fontsize=16)
-    fig.savefig(f"Python-{benchmark}.png", format="png")
 
+def platform_label(machine: str) -> str:
+    """What to call a machine in plots."""
+    if machine == WASM:
+        return "WASM32"
+    return f"{machine} Native"
 
-if __name__ == "__main__":
-    R_plot("coin_flips", "Coin Flips Benchmark", "Number of coin flips")
-    R_plot(
-        "matrix-multiply",
-        "Matrix Multiplication Benchmark",
-        "Size of the square matrix",
+
+def _machines(results: pd.DataFrame) -> list[str]:
+    # WASM first, on the left, then native machines.
+    return sorted(results["machine"].unique(), key=lambda m: (m != WASM, m))
+
+
+def plot_benchmark(results: pd.DataFrame, output: Path) -> Path:
+    """Draw the timings of a benchmark on each machine side by side."""
+    (language, benchmark) = results[["language", "benchmark"]].iloc[0]
+    # Timers in the browser can be too coarse to time the smallest parameters.
+    results = results[results["seconds"] > 0]
+    # Sort numeric parameters as numbers, even when other benchmarks' are not.
+    parameters = pd.to_numeric(results["parameter"], errors="coerce")
+    if parameters.notna().all():
+        results = results.assign(parameter=parameters)
+    machines = _machines(results)
+    fig, ax = plt.subplots(
+        nrows=1, ncols=len(machines), figsize=(6 * len(machines), 6), squeeze=False
     )
 
-    python_plot(
-        "matrix-inverse", "Invert matrix benchmark", "Size of the square matrix"
+    y_min = results["seconds"].min()
+    y_max = results["seconds"].max()
+    for column, machine in enumerate(machines):
+        axis = ax[0][column]
+        on_machine = results[results["machine"] == machine]
+        on_machine.boxplot(column="seconds", by="parameter", ax=axis)
+        axis.set_title(platform_label(machine))
+        axis.set_ylim([y_min, y_max])
+        axis.set_xlabel(results["parameter_name"].iloc[0], fontsize=FONTSIZE)
+        axis.set_yscale("log")
+        axis.tick_params(labelsize=FONTSIZE)
+        if column == 0:
+            axis.set_ylabel("Time (seconds)", fontsize=FONTSIZE)
+        else:
+            axis.tick_params(axis="y", which="both", length=0)
+            axis.set_yticklabels([])
+
+    plt.tight_layout()
+    fig.suptitle(results["title"].iloc[0], fontsize=16)
+    filename = Path(output) / f"{language}-{benchmark}.png"
+    fig.savefig(filename, format="png")
+    plt.close(fig)
+    return filename
+
+
+def speedup_table(results: pd.DataFrame) -> pd.DataFrame:
+    """The median time of each benchmark and parameter on each machine, and
+    how many times slower WASM is than each native machine."""
+    medians = results.pivot_table(
+        index=["language", "benchmark", "parameter"],
+        columns="machine",
+        values="seconds",
+        aggfunc="median",
     )
-    python_plot("sum-list", "Sum a random list benchmark", "Length of the list")
+    if WASM in medians.columns:
+        for machine in medians.columns.drop(WASM):
+            medians[f"slowdown vs {machine}"] = medians[WASM] / medians[machine]
+    return medians
+
+
+def main(data: Path = Path("data"), output: Path = Path(".")):
+    """Plot every benchmark and write the speedup table."""
+    results = load_results(data)
+    for _, benchmark in results.groupby(["language", "benchmark"]):
+        print(f"Plotted {plot_benchmark(benchmark, output)}")
+
+    table = speedup_table(results)
+    table.to_csv(Path(output) / "speedup.csv")
+    print(table.to_string(float_format="{:.4g}".format))
+
+
+if __name__ == "__main__":
+    main()
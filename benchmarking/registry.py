@@ -0,0 +1,179 @@
+"""Registry of the Python microbenchmarks comparing native vs WASM performance.
+
+A benchmark is a function of one parameter, registered with the values of the
+parameter to sweep:
+
+    @register(
+        "sum-list",
+        title="Sum a random list benchmark",
+        parameter="Length of the list",
+        params=[10_000, 100_000, 1_000_000],
+    )
+    def sum_list(size: int) -> int:
+        ...
+
+Each value is timed `runs` times, after `warmup` untimed calls. Results are
+tidy: one row per timed call, along with the environment it ran in, so the
+results of a WASM run, which only hands back a single file, describe
+themselves.
+
+This module only uses the standard library, so that it runs under Pyodide
+too: runner.py bundles it with a benchmark into a single script that can be
+published as a JINet application, whose `main` runs the benchmark.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+import csv
+import os
+import platform
+import sys
+import timeit
+
+# The columns of a results file, see plot.py.
+FIELDS = [
+    "benchmark",
+    "title",
+    "parameter_name",
+    "parameter",
+    "run",
+    "seconds",
+    "language",
+    "interpreter",
+    "machine",
+    "blas",
+    "blas_threads",
+]
+
+# Environment variables setting the number of BLAS threads, by precedence.
+_BLAS_THREADS = ["OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "OMP_NUM_THREADS"]
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """A function timed for each of `params`, `parameter` saying what they are."""
+
+    name: str
+    function: Callable[[Any], Any]
+    title: str
+    parameter: str
+    params: Sequence[Any]
+    runs: int = 100
+    warmup: int = 3
+
+
+# Registered benchmarks, by name.
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def register(
+    name: str,
+    title: str,
+    parameter: str,
+    params: Sequence[Any],
+    runs: int = 100,
+    warmup: int = 3,
+) -> Callable:
+    """Register a function as a benchmark."""
+
+    def decorator(function: Callable) -> Callable:
+        benchmark = Benchmark(
+            name=name,
+            function=function,
+            title=title,
+            parameter=parameter,
+            params=list(params),
+            runs=runs,
+            warmup=warmup,
+        )
+        BENCHMARKS[benchmark.name] = benchmark
+        return function
+
+    return decorator
+
+
+def machine() -> str:
+    """The architecture benchmarks run on, wasm32 under Pyodide."""
+    return platform.machine() or os.uname().machine
+
+
+def _interpreter() -> str:
+    interpreter = f"{platform.python_implementation()} {platform.python_version()}"
+    if (pyodide := sys.modules.get("pyodide")) is not None:
+        interpreter += f" (Pyodide {getattr(pyodide, '__version__', '?')})"
+    return interpreter
+
+
+def _blas() -> str:
+    if (numpy := sys.modules.get("numpy")) is None:
+        return ""
+    try:
+        config = numpy.show_config(mode="dicts")
+        blas = config["Build Dependencies"]["blas"]
+        return f"{blas['name']} {blas.get('version', '')}".strip()
+    except (AttributeError, KeyError, TypeError):
+        return ""
+
+
+def _blas_threads() -> str:
+    for variable in _BLAS_THREADS:
+        if threads := os.environ.get(variable):
+            return threads
+    return ""
+
+
+def environment() -> dict[str, str]:
+    """Describe where benchmarks are running, for each row of the results."""
+    return {
+        "language": "Python",
+        "interpreter": _interpreter(),
+        "machine": machine(),
+        "blas": _blas(),
+        "blas_threads": _blas_threads(),
+    }
+
+
+def run(
+    benchmark: Benchmark, runs: Optional[int] = None, warmup: Optional[int] = None
+) -> list[dict[str, Any]]:
+    """Run a benchmark's parameter sweep and return a row per timed call."""
+    runs = benchmark.runs if runs is None else runs
+    warmup = benchmark.warmup if warmup is None else warmup
+    context = environment()
+    rows = []
+    for param in benchmark.params:
+        print(f"Running {benchmark.name} {param}...", end="", flush=True)
+        timer = timeit.Timer(lambda: benchmark.function(param))
+        if warmup > 0:
+            timer.repeat(repeat=warmup, number=1)
+        for run_number, seconds in enumerate(timer.repeat(repeat=runs, number=1)):
+            rows.append(
+                {
+                    "benchmark": benchmark.name,
+                    "title": benchmark.title,
+                    "parameter_name": benchmark.parameter,
+                    "parameter": param,
+                    "run": run_number,
+                    "seconds": seconds,
+                }
+                | context
+            )
+        print("[DONE]")
+    return rows
+
+
+def write_results(rows: list[dict[str, Any]], filename: str) -> str:
+    """Write rows of results as CSV and return the filename."""
+    with open(filename, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return filename
+
+
+def main(unused):
+    """Run every registered benchmark, as a JINet application does."""
+    rows = []
+    for benchmark in BENCHMARKS.values():
+        rows.extend(run(benchmark))
+    return write_results(rows, f"Python-{machine()}.csv")
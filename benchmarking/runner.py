@@ -0,0 +1,210 @@
+"""Run the native vs WASM microbenchmarks.
+
+Benchmarks are discovered in this directory: Python scripts registering
+functions with registry.py and R scripts doing so with registry.R.
+
+    python runner.py list
+    python runner.py run [NAME ...] [--runs N] [--warmup N] [--no-plot]
+    python runner.py bundle NAME > NAME-bundle.py
+    python runner.py plot
+
+`run` runs benchmarks natively, Python ones in this process and R ones with
+Rscript, and merges their results into data/<language>-<machine>.csv. WASM
+results are obtained by publishing the script `bundle` prints, a benchmark
+and its registry in a single file, as a JINet application and saving the
+file it outputs in data/. Plots and a speedup table are then made from
+everything in data/ by plot.py, in the current directory.
+"""
+
+from pathlib import Path
+import argparse
+import csv
+import importlib.util
+import re
+import shutil
+import subprocess
+import sys
+
+import registry
+
+HERE = Path(__file__).resolve().parent
+
+# How a script registers benchmarks. Imports are matched as whole lines, so
+# that this script, which only mentions them, is not taken for a benchmark.
+_PYTHON_IMPORT = "from registry import register"
+_PYTHON_IMPORT_LINE = re.compile(rf"^{re.escape(_PYTHON_IMPORT)}$", re.M)
+_R_SOURCE = 'source("registry.R")'
+_R_SOURCE_LINE = re.compile(rf"^{re.escape(_R_SOURCE)}$", re.M)
+_R_REGISTER = re.compile(r'register\(\s*"([^"]+)"')
+
+
+def python_scripts() -> list[Path]:
+    """The Python scripts defining benchmarks."""
+    return sorted(
+        path
+        for path in HERE.glob("*.py")
+        if _PYTHON_IMPORT_LINE.search(path.read_text())
+    )
+
+
+def r_benchmarks() -> dict[str, Path]:
+    """The R benchmarks, by name, with the script defining each."""
+    return {
+        name: path
+        for path in sorted(HERE.glob("*.R"))
+        if _R_SOURCE_LINE.search(source := path.read_text())
+        for name in _R_REGISTER.findall(source)
+    }
+
+
+def load_python_benchmarks() -> dict[str, registry.Benchmark]:
+    """Import the Python scripts to register their benchmarks.
+
+    A script that cannot be imported, most likely for want of a library it
+    benchmarks, is skipped with a warning.
+    """
+    for path in python_scripts():
+        spec = importlib.util.spec_from_file_location(f"benchmark_{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(module)
+        except ImportError as err:
+            print(f"Skipping {path.name}: {err}", file=sys.stderr)
+    return registry.BENCHMARKS
+
+
+def merge_results(rows: list[dict], filename: Path) -> None:
+    """Replace the results of the benchmarks in `rows` in a results file."""
+    benchmarks = {row["benchmark"] for row in rows}
+    kept = []
+    if filename.exists():
+        with open(filename, newline="") as file:
+            kept = [
+                row
+                for row in csv.DictReader(file)
+                if row["benchmark"] not in benchmarks
+            ]
+    registry.write_results(kept + rows, str(filename))
+
+
+def run_python(names: list[str], runs, warmup, data: Path) -> None:
+    """Run Python benchmarks in this process."""
+    rows = []
+    for name in names:
+        rows.extend(registry.run(registry.BENCHMARKS[name], runs, warmup))
+    if rows:
+        merge_results(rows, data / f"Python-{registry.machine()}.csv")
+
+
+def run_r(names: list[str], scripts: dict[str, Path], runs, warmup, data) -> None:
+    """Run R benchmarks with Rscript, in this directory where registry.R is."""
+    if not names:
+        return
+    if shutil.which("Rscript") is None:
+        print(f"Skipping {', '.join(names)}: Rscript not found", file=sys.stderr)
+        return
+
+    sources = "".join(
+        f'source("{path.name}"); ' for path in sorted({scripts[n] for n in names})
+    )
+    keep = ", ".join(f'"{name}"' for name in names)
+    settings = "".join(
+        f"b${field} <- {value}; "
+        for (field, value) in (("iterations", runs), ("warmup", warmup))
+        if value is not None
+    )
+    completed = subprocess.run(
+        [
+            "Rscript",
+            "-e",
+            f"{sources}BENCHMARKS <- lapply(BENCHMARKS[c({keep})], "
+            f"function(b) {{ {settings}b }}); cat(main())",
+        ],
+        cwd=HERE,
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    # main() prints the name of the file it wrote, after anything the
+    # benchmarks themselves print.
+    produced = HERE / completed.stdout.strip().splitlines()[-1]
+    with open(produced, newline="") as file:
+        rows = list(csv.DictReader(file))
+    produced.unlink()
+    merge_results(rows, data / produced.name)
+
+
+def bundle(name: str) -> str:
+    """A single script running a benchmark, to publish as a JINet application."""
+    if name in (scripts := r_benchmarks()):
+        (registry_file, script, line) = ("registry.R", scripts[name], _R_SOURCE)
+    else:
+        script = next(
+            (
+                path
+                for path in python_scripts()
+                if re.search(rf'register\(\s*"{re.escape(name)}"', path.read_text())
+            ),
+            None,
+        )
+        if script is None:
+            raise SystemExit(f"No benchmark named {name}")
+        (registry_file, line) = ("registry.py", _PYTHON_IMPORT)
+
+    source = "\n".join(
+        text for text in script.read_text().splitlines() if text.strip() != line
+    )
+    return f"{(HERE / registry_file).read_text()}\n\n{source}\n"
+
+
+def main():
+    """Run the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the benchmarks")
+    run = commands.add_parser("run", help="Run benchmarks natively")
+    run.add_argument("names", nargs="*", help="The benchmarks to run, all by default")
+    run.add_argument("--runs", type=int, help="Timed runs of each parameter")
+    run.add_argument("--warmup", type=int, help="Untimed runs of each parameter")
+    run.add_argument("--data", type=Path, default=HERE / "data")
+    run.add_argument("--no-plot", action="store_true")
+    bundled = commands.add_parser("bundle", help="Print a benchmark for WASM")
+    bundled.add_argument("name")
+    plot_command = commands.add_parser("plot", help="Plot the results")
+    plot_command.add_argument("--data", type=Path, default=HERE / "data")
+    args = parser.parse_args()
+
+    if args.command == "bundle":
+        print(bundle(args.name), end="")
+        return
+
+    if args.command == "plot":
+        import plot
+
+        plot.main(args.data)
+        return
+
+    python = load_python_benchmarks()
+    r = r_benchmarks()
+    if args.command == "list":
+        for name, benchmark in python.items():
+            print(f"{name:>20}  Python  {benchmark.title}")
+        for name in r:
+            print(f"{name:>20}  R")
+        return
+
+    names = args.names or [*python, *r]
+    if unknown := [name for name in names if name not in python and name not in r]:
+        raise SystemExit(f"No benchmark named {', '.join(unknown)}")
+    args.data.mkdir(exist_ok=True)
+    run_python([n for n in names if n in python], args.runs, args.warmup, args.data)
+    run_r([n for n in names if n in r], r, args.runs, args.warmup, args.data)
+
+    if not args.no_plot:
+        import plot
+
+        plot.main(args.data)
+
+
+if __name__ == "__main__":
+    main()
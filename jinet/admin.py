@@ -0,0 +1,206 @@
+"""Administration panels.
+
+The admin page only lays out a panel per table. Each panel fetches a page of
+its rows by itself, selecting only the columns it shows and its sort key, and
+can be filtered by a search term matched against its names.
+"""
+
+from typing import Annotated, Any, Optional, Sequence
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import HTMLResponse
+from sqlalchemy import ColumnElement, Select, or_
+from sqlmodel import Session, func, select
+
+from jinet import auth
+from jinet.db import database_session
+from jinet.models import LatestPackage, Package, PermissionRequest, SampleData, User
+from jinet.packages import keyset_page
+from jinet.templates import templates
+
+# Rows in a page of a panel.
+ADMIN_PAGE_SIZE = 50
+
+router = APIRouter()
+
+
+def _matching(query: Select, term: Optional[str], *columns: ColumnElement) -> Select:
+    """Restrict a query to the rows with any of `columns` containing a term."""
+    if term is None:
+        return query
+    return query.where(
+        or_(*(column.icontains(term, autoescape=True) for column in columns))
+    )
+
+
+async def _panel(
+    request: Request,
+    session: Session,
+    name: str,
+    query: Select,
+    key: Sequence[ColumnElement],
+    after: Optional[str],
+    before: Optional[str],
+    page: int,
+    filters: dict[str, Any],
+):
+    filters = {k: v for (k, v) in filters.items() if v is not None}
+    total = (
+        await session.exec(select(func.count()).select_from(query.subquery()))
+    ).one()
+    (rows, pagination) = await keyset_page(
+        session, query, key, after, before, page, total, filters, ADMIN_PAGE_SIZE
+    )
+    return templates.TemplateResponse(
+        request=request,
+        name=f"admin-{name}.html",
+        context={
+            "panel": name,
+            "rows": rows,
+            "total": total,
+            "pagination": pagination,
+        },
+    )
+
+
+@router.get("/requests", response_class=HTMLResponse)
+async def permission_requests(
+    request: Request,
+    session: Annotated[Session, Depends(database_session)],
+    admin: Annotated[User, Depends(auth.current_admin)],
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    page: int = 1,
+    term: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """Permission requests, oldest first, by username and status."""
+    term = term or None
+    status = status or None
+    query = _matching(
+        select(
+            PermissionRequest.user_id,
+            PermissionRequest.permission,
+            PermissionRequest.status,
+            User.username,
+            PermissionRequest.id,
+        ).join(User, PermissionRequest.user_id == User.id),
+        term,
+        User.username,
+    )
+    if status is not None:
+        query = query.where(PermissionRequest.status == status)
+    return await _panel(
+        request,
+        session,
+        "requests",
+        query,
+        [PermissionRequest.id],
+        after,
+        before,
+        page,
+        {"term": term, "status": status},
+    )
+
+
+@router.get("/users", response_class=HTMLResponse)
+async def users(
+    request: Request,
+    session: Annotated[Session, Depends(database_session)],
+    admin: Annotated[User, Depends(auth.current_admin)],
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    page: int = 1,
+    term: Optional[str] = None,
+):
+    """Users, in the order they signed up, by username."""
+    term = term or None
+    query = _matching(
+        select(User.username, User.role, User.created, User.can_upload, User.id),
+        term,
+        User.username,
+    )
+    return await _panel(
+        request,
+        session,
+        "users",
+        query,
+        [User.id],
+        after,
+        before,
+        page,
+        {"term": term},
+    )
+
+
+@router.get("/apps", response_class=HTMLResponse)
+async def apps(
+    request: Request,
+    session: Annotated[Session, Depends(database_session)],
+    admin: Annotated[User, Depends(auth.current_admin)],
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    page: int = 1,
+    term: Optional[str] = None,
+):
+    """The latest version of each application, by name and owner."""
+    term = term or None
+    query = _matching(
+        select(
+            Package.id,
+            Package.runtime,
+            Package.version,
+            User.username,
+            LatestPackage.name,
+            LatestPackage.owner_id,
+        )
+        .join(LatestPackage, LatestPackage.package_id == Package.id)
+        .join(User, LatestPackage.owner_id == User.id),
+        term,
+        LatestPackage.name,
+        User.username,
+    )
+    return await _panel(
+        request,
+        session,
+        "apps",
+        query,
+        [LatestPackage.name, LatestPackage.owner_id],
+        after,
+        before,
+        page,
+        {"term": term},
+    )
+
+
+@router.get("/data", response_class=HTMLResponse)
+async def sample_data(
+    request: Request,
+    session: Annotated[Session, Depends(database_session)],
+    admin: Annotated[User, Depends(auth.current_admin)],
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    page: int = 1,
+    term: Optional[str] = None,
+):
+    """Sample data, oldest first, by filename and owner."""
+    term = term or None
+    query = _matching(
+        select(SampleData.name, SampleData.mime, User.username, SampleData.id).join(
+            User, SampleData.owner_id == User.id
+        ),
+        term,
+        SampleData.name,
+        User.username,
+    )
+    return await _panel(
+        request,
+        session,
+        "data",
+        query,
+        [SampleData.id],
+        after,
+        before,
+        page,
+        {"term": term},
+    )
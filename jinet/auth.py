@@ -1,6 +1,7 @@
 """Authorisation / login."""
 
-from typing import Annotated, Any, Callable
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Any, Callable, Optional
 import json
 import secrets
 
@@ -11,6 +12,7 @@ from authlib.integrations.starlette_client import OAuth
 
 from sqlmodel import delete, select, Session
 
+from jinet.cache import TTLCache
 from jinet.config import settings
 from jinet.db import database_session
 from jinet.models import User, UserToken
@@ -44,18 +46,64 @@ async def user_in_context(request: Request, session: Session):
         return {}
 
 
+# Users logged in with a token, detached from any session.
+_users: TTLCache[str, User] = TTLCache(
+    settings.token_cache_size, settings.token_cache_ttl
+)
+
+# Tokens older than this are no longer accepted, and are deleted by jinet.maintenance.
+_token_ttl = timedelta(seconds=settings.token_ttl)
+
+# Marks a request whose user has not been looked up yet.
+_UNKNOWN = object()
+
+
+def forget_token(token: str) -> None:
+    """Stop recognising a login token cached by this process."""
+    _users.pop(token)
+
+
+def forget_users() -> None:
+    """Drop every cached user, e.g. after changing what a user may do."""
+    _users.clear()
+
+
+async def _token_user(session: Session, token: Optional[str]) -> Optional[User]:
+    if token is None:
+        return None
+
+    if (user := _users.get(token)) is None:
+        user = (
+            await session.exec(
+                select(User)
+                .join(UserToken)
+                .where(UserToken.token == token)
+                .where(UserToken.created > datetime.now(timezone.utc) - _token_ttl)
+            )
+        ).one_or_none()
+        if user is None:
+            return None
+        session.expunge(user)
+        _users.put(token, user)
+
+    # Every request gets its own copy of the cached user in its own session.
+    return await session.merge(user, load=False)
+
+
 async def current_user(
     request: Request, session: Annotated[Session, Depends(database_session)]
 ) -> User:
-    """Get the user based on the token. To be used with Depends()."""
+    """Get the user based on the token. To be used with Depends().
+
+    The user is looked up once per request, and tokens are cached briefly
+    across requests.
+    """
     request.session["from"] = request.url.path
 
-    if (token := request.session.get("token", None)) is None:
-        raise RequiresLoginException()
+    if (user := getattr(request.state, "user", _UNKNOWN)) is _UNKNOWN:
+        user = await _token_user(session, request.session.get("token", None))
+        request.state.user = user
 
-    user = (
-        await session.exec(select(User).join(UserToken).where(UserToken.token == token))
-    ).one_or_none()
     if user is None:
         raise RequiresLoginException()
 
@@ -89,6 +137,7 @@ async def logout(
     token = request.session.pop("token")
     await session.exec(delete(UserToken).where(UserToken.token == token))
     await session.commit()
+    forget_token(token)
     return RedirectResponse(request.url_for("index"))
 
 
@@ -0,0 +1,193 @@
+"""Content-addressed storage for binary data.
+
+Data of a compressible media type is gzipped once, on its way into the store,
+and kept that way: it is sent as is to clients that accept gzip and only
+decompressed, as it is streamed, for those that do not.
+"""
+
+from contextlib import aclosing
+from datetime import datetime, timezone
+from hashlib import sha256
+from typing import AsyncIterator
+import gzip
+import re
+import zlib
+
+from fastapi import UploadFile
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, func, select
+from starlette.concurrency import run_in_threadpool
+
+from jinet.db import engine
+from jinet.filesize import digest_upload
+from jinet.models import Blob, Package, SampleData, ShareData, Upload
+
+# Blobs are read back from the database in slices of this many bytes.
+CHUNK_SIZE = 64 * 1024
+
+# Media types worth compressing, the others are most likely compressed already.
+_COMPRESSIBLE = re.compile(
+    r"text/.+|application/(json|javascript|xml|csv|x-python|.+\+json|.+\+xml)"
+    r"|image/svg\+xml"
+)
+
+# Columns referring to blobs, with the owner of each reference. A blob that is
+# not referred to is vacuumed by jinet.maintenance.
+REFERENCES = (
+    (Package.data_digest, Package.owner_id),
+    (Package.logo_digest, Package.owner_id),
+    (SampleData.data_digest, SampleData.owner_id),
+    (ShareData.data_digest, ShareData.owner_id),
+    (Upload.digest, Upload.owner_id),
+)
+
+# zlib window bits selecting the gzip format.
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+COMPRESS_LEVEL = 6
+
+
+def digest(data: bytes) -> str:
+    """The key of some data in the blob store."""
+    return sha256(data).hexdigest()
+
+
+def compressible(media_type: str | None) -> bool:
+    """Whether data of a media type is worth storing compressed."""
+    if media_type is None:
+        return False
+    return _COMPRESSIBLE.fullmatch(media_type.split(";")[0].strip().lower()) is not None
+
+
+def compressor():
+    """A streaming gzip compressor for data on its way into the store."""
+    return zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, _GZIP_WBITS)
+
+
+def _encode(data: bytes) -> tuple[str, bytes]:
+    compressed = gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+    if len(compressed) < len(data):
+        return ("gzip", compressed)
+    return ("identity", data)
+
+
+async def _insert(session: Session, key: str, data: bytes, compress: bool) -> None:
+    (encoding, stored) = ("identity", data)
+    if compress:
+        (encoding, stored) = await run_in_threadpool(_encode, data)
+    await session.exec(
+        insert(Blob)
+        .values(
+            digest=key,
+            size=len(data),
+            encoding=encoding,
+            stored_size=len(stored),
+            data=stored,
+            created=datetime.now(timezone.utc),
+        )
+        # A blob stored again is as good as new, so the vacuum spares it until
+        # whatever now refers to it is committed.
+        .on_conflict_do_update(
+            index_elements=["digest"], set_={"created": func.now()}
+        )
+    )
+
+
+async def claim(session: Session, key: str) -> bool:
+    """Check whether a blob is in the store and keep it there until the end of
+    the transaction, for something to refer to it.
+
+    The blob is locked so that jinet.maintenance does not vacuum it meanwhile.
+    """
+    query = (
+        select(Blob.digest)
+        .where(Blob.digest == key)
+        .with_for_update(read=True, key_share=True)
+    )
+    return (await session.exec(query)).first() is not None
+
+
+async def store(session: Session, data: bytes, compress: bool = False) -> str:
+    """Store data in the blob store, unless it is already there, and return its key."""
+    key = digest(data)
+    await _insert(session, key, data, compress)
+    return key
+
+
+async def store_upload(
+    session: Session, upload: UploadFile, limit: int, compress: bool = False
+) -> str:
+    """Store an uploaded file in the blob store and return its key.
+
+    The upload is hashed and checked against the size limit as it is read from
+    its spool file. It is only read into memory, once, when it is not already
+    in the store.
+    """
+    (key, _) = await digest_upload(upload, limit)
+    if not await claim(session, key):
+        await upload.seek(0)
+        await _insert(session, key, await upload.read(), compress)
+    return key
+
+
+async def load(session: Session, key: str) -> bytes:
+    """Read a whole blob into memory, decompressed."""
+    (encoding, data) = (
+        await session.exec(select(Blob.encoding, Blob.data).where(Blob.digest == key))
+    ).one()
+    if encoding == "gzip":
+        return await run_in_threadpool(gzip.decompress, data)
+    return data
+
+
+async def stream(
+    key: str, size: int, start: int = 0, chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """Read `size` stored bytes of a blob from `start`, chunk by chunk without loading all of it.
+
+    This uses its own connection as the request's database session is closed
+    before a streaming response body is sent.
+    """
+    async with engine.connect() as connection:
+        for offset in range(start, start + size, chunk_size):
+            length = min(chunk_size, start + size - offset)
+            chunk = await connection.execute(
+                select(func.substring(Blob.data, offset + 1, length)).where(
+                    Blob.digest == key
+                )
+            )
+            yield chunk.scalar_one()
+
+
+async def _inflate(key: str, stored_size: int) -> AsyncIterator[bytes]:
+    decompressor = zlib.decompressobj(_GZIP_WBITS)
+    async for chunk in stream(key, stored_size):
+        while chunk:
+            yield decompressor.decompress(chunk, CHUNK_SIZE)
+            chunk = decompressor.unconsumed_tail
+    # zlib can still hold back output once all of the input is consumed.
+    while data := decompressor.decompress(b"", CHUNK_SIZE):
+        yield data
+    yield decompressor.flush()
+
+
+async def stream_decompressed(
+    key: str, stored_size: int, start: int, size: int
+) -> AsyncIterator[bytes]:
+    """Read `size` bytes of a gzipped blob's original data from `start`.
+
+    The blob is decompressed from its beginning, but never more than a chunk
+    at a time.
+    """
+    (skip, remaining) = (start, size)
+    async with aclosing(_inflate(key, stored_size)) as decompressed:
+        async for data in decompressed:
+            if skip >= len(data):
+                skip -= len(data)
+                continue
+            data = data[skip : skip + remaining]
+            skip = 0
+            remaining -= len(data)
+            yield data
+            if remaining == 0:
+                return
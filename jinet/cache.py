@@ -0,0 +1,52 @@
+"""In-process caches."""
+
+from collections import OrderedDict
+from time import monotonic
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """A bounded least-recently-used cache whose entries expire after `ttl` seconds.
+
+    Entries are only ever invalidated in the process that holds them, so the
+    expiry bounds how stale another worker's copy can be.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        """Get an entry if it is present and has not expired."""
+        if (entry := self._entries.get(key)) is None:
+            return None
+
+        (expires, value) = entry
+        if expires < monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        """Add an entry, evicting the least recently used one if full."""
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """Remove an entry if it is present."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,7 @@
 """Application runtime configuration."""
 
 import secrets
+from typing import Any, Optional
 
 from pydantic import PostgresDsn
 from pydantic_settings import BaseSettings
@@ -17,5 +18,78 @@ class Settings(BaseSettings):
 
     database_uri: PostgresDsn
 
+    # Database engine and connection pool.
+    database_echo: bool = False
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_pre_ping: bool = True
+    database_pool_recycle: int = 1800
+    # Prepared statements kept per connection by the asyncpg driver.
+    database_statement_cache_size: int = 500
+
+    # Largest file of each kind that can be uploaded, in bytes.
+    max_package_size: int = 2 * 1024 * 1024
+    max_logo_size: int = 2 * 1024 * 1024
+    max_sample_data_size: int = 256 * 1024 * 1024
+    max_share_size: int = 64 * 1024 * 1024
+    # Largest chunk accepted by a resumable upload, see jinet.uploads.
+    upload_chunk_size: int = 4 * 1024 * 1024
+
+    # Bytes of storage each user may use, unless set for the user.
+    storage_quota: int = 1024 * 1024 * 1024
+
+    # Logged in users by login token.
+    token_cache_size: int = 4096
+    token_cache_ttl: int = 60
+
+    # Fully qualified package names resolved to package ids.
+    resolver_cache_size: int = 4096
+    resolver_cache_ttl: int = 300
+
+    # Application counts for the paginated package listing.
+    listing_count_cache_size: int = 256
+    listing_count_cache_ttl: int = 60
+    tag_cloud_cache_ttl: int = 60
+
+    # How long, in seconds, things are kept before they expire, see jinet.maintenance.
+    token_ttl: int = 30 * 24 * 60 * 60
+    share_ttl: int = 180 * 24 * 60 * 60
+    upload_ttl: int = 24 * 60 * 60
+    # Unreferenced blobs younger than this are left alone.
+    blob_grace_period: int = 60 * 60
+    blob_vacuum_batch_size: int = 500
+    maintenance_interval: int = 60 * 60
+
+    # Templates: reload them when their files change, which is for development,
+    # and where to keep them compiled, a temporary directory by default.
+    template_auto_reload: bool = False
+    template_cache_dir: Optional[str] = None
+    # Rendered template fragments, see jinet.templates.
+    fragment_cache_size: int = 4096
+    fragment_cache_ttl: int = 300
+
+    # Scripts rendered by jinet.js, and how many applications to render them
+    # for at startup.
+    script_cache_size: int = 1024
+    script_cache_ttl: int = 3600
+    script_warm_up_count: int = 100
+
+    # Shared result pages, rendered and gzipped.
+    share_page_cache_size: int = 64
+    share_page_cache_ttl: int = 300
+
+    def engine_options(self) -> dict[str, Any]:
+        """Keyword arguments to create the database engine with."""
+        return {
+            "echo": self.database_echo,
+            "pool_size": self.database_pool_size,
+            "max_overflow": self.database_max_overflow,
+            "pool_pre_ping": self.database_pool_pre_ping,
+            "pool_recycle": self.database_pool_recycle,
+            "connect_args": {
+                "prepared_statement_cache_size": self.database_statement_cache_size
+            },
+        }
+
 
 settings = Settings()
@@ -2,15 +2,16 @@
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, File, Request, Response, UploadFile
+from fastapi import APIRouter, Depends, File, Request, UploadFile
 from fastapi.responses import HTMLResponse, RedirectResponse
 
-from sqlmodel import select, Session, delete
+from sqlmodel import select, Session, delete, desc
 
-from jinet import auth
+from jinet import auth, blobs, quotas
 from jinet.db import database_session
-from jinet.models import SampleData, User
-from jinet.filesize import valid_content_len, read_upload_file
+from jinet.models import Blob, SampleData, User
+from jinet.filesize import MAX_CONTENT_LEN, valid_content_len
+from jinet.responses import REVALIDATE, blob_response
 
 router = APIRouter()
 
@@ -23,14 +24,27 @@ async def new(
     session: Annotated[Session, Depends(database_session)],
     owner: Annotated[User, Depends(auth.current_user)],
 ):
+    """Add a small sample data file, sent in a single request.
+
+    Files are read into memory on their way into the blob store, so this is
+    limited like any other request body. Larger files, up to the sample data
+    size limit, are uploaded in chunks with jinet.uploads, as the data page does.
+    """
     if not owner.can_upload:
         return RedirectResponse(request.session.get("from", "/data"))
+    await quotas.check_quota(session, owner, filedata.size)
 
     sample_data = SampleData(
         name=filedata.filename,
-        data=read_upload_file(filedata),
+        data_digest=await blobs.store_upload(
+            session,
+            filedata,
+            MAX_CONTENT_LEN,
+            compress=blobs.compressible(filedata.content_type),
+        ),
         mime=filedata.content_type,
-        owner=owner,
+        size=filedata.size,
+        owner_id=owner.id,
     )
     session.add(sample_data)
     await session.commit()
@@ -42,13 +56,30 @@ async def new(
 async def datafile(
     request: Request, name: str, session: Session = Depends(database_session)
 ):
-    """Get the sample data file from the database."""
-    query = select(SampleData).where(SampleData.name == name)
+    """Get the sample data file from the database.
+
+    Sample data can be replaced under the same name, so clients revalidate
+    what they hold with its ETag.
+    """
+    query = (
+        select(Blob.digest, Blob.size, Blob.encoding, Blob.stored_size, SampleData.mime)
+        .join(Blob, SampleData.data_digest == Blob.digest)
+        .where(SampleData.name == name)
+        .order_by(desc(SampleData.id))
+    )
     result = (await session.exec(query)).first()
     if result is None:
         return RedirectResponse(request.session.get("from", "/data"))
 
-    return Response(content=result.data, media_type=result.mime)
+    return blob_response(
+        request,
+        result.digest,
+        result.size,
+        media_type=result.mime,
+        cache_control=REVALIDATE,
+        encoding=result.encoding,
+        stored_size=result.stored_size,
+    )
 
 
 @router.delete("/delete/{identifier}", response_class=HTMLResponse)
@@ -1,29 +1,40 @@
 """Define limits on upload file size."""
 
-from io import BytesIO
+from hashlib import sha256
+
 from fastapi import Header, UploadFile, HTTPException, status
 
 # 2mb
 MAX_CONTENT_LEN = 2 * 1024 * 1024
 
+# Uploads are read back from their spool file in chunks of this many bytes.
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 
 async def valid_content_len(content_length: int = Header(..., lt=MAX_CONTENT_LEN)):
     """Limit the Content-Length header to be < 100k."""
     return content_length
 
 
-def read_upload_file(thefile: UploadFile) -> bytes:
-    """Extract data from an UploadFile but throw if too large."""
-    buf = BytesIO()
+async def digest_upload(
+    thefile: UploadFile, limit: int = MAX_CONTENT_LEN
+) -> tuple[str, int]:
+    """Hash an UploadFile chunk by chunk but throw as soon as it is too large.
+
+    Returns the SHA-256 digest of the file and its size. Uploads are spooled by
+    Starlette, to disk once they are large, and reading them asynchronously
+    does that IO off the event loop.
+    """
+    hasher = sha256()
     actual_size = 0
-    for chunk in thefile.file:
+    await thefile.seek(0)
+    while chunk := await thefile.read(UPLOAD_CHUNK_SIZE):
         actual_size += len(chunk)
-        if actual_size > MAX_CONTENT_LEN:
+        if actual_size > limit:
             raise HTTPException(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail="File too large.",
             )
 
-        buf.write(chunk)
-    buf.seek(0)
-    return buf.read()
+        hasher.update(chunk)
+    return (hasher.hexdigest(), actual_size)
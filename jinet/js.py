@@ -1,55 +1,144 @@
-"""Javascript source templating."""
+"""Javascript source templating.
 
+A script only depends on its template and, when rendered for an application,
+on the package version a fully qualified name refers to. Scripts are rendered
+and gzipped once and cached until the catalog changes. Pages link to them with
+the version of the script templates, so browsers can keep them for good, unless
+they are rendered for an application: a package version can be published again
+after it is deleted, so those are revalidated.
+"""
+
+from hashlib import sha256
 from typing import Optional
+import gzip
+import logging
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlmodel import Session, select
 
-from jinet.db import database_session
-from jinet.models import User, Package
-from jinet.packages import parse_package_name
-from jinet.templates import templates
+from jinet import blobs
+from jinet.cache import TTLCache
+from jinet.config import settings
+from jinet.db import async_session, database_session
+from jinet.models import LatestPackage, Package, User
+from jinet.packages import resolve_package
+from jinet.responses import IMMUTABLE, REVALIDATE, compressed_response
+from jinet.templates import data_version, templates
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# The templates that can be rendered as scripts.
+SCRIPTS = frozenset(templates.env.list_templates(extensions=["js"]))
+
+# The script running each runtime, see packages.run.
+RUNTIME_SCRIPTS = {"python-runtime": "ui-python.js", "R-runtime": "ui-R.js"}
+
+# Changes whenever a script template does, to tell apart the scripts of
+# different deployments.
+SCRIPT_VERSION = sha256(
+    b"".join(
+        templates.env.loader.get_source(templates.env, script)[0].encode()
+        for script in sorted(SCRIPTS)
+    )
+).hexdigest()[:16]
+templates.env.globals["script_version"] = SCRIPT_VERSION
+
+# Rendered scripts by script, application and catalog version, as the hash of
+# their source and the gzipped source.
+_scripts: TTLCache[tuple[str, Optional[str], int], tuple[str, bytes]] = TTLCache(
+    settings.script_cache_size, settings.script_cache_ttl
+)
+
+
+def _render(
+    script: str, application: Optional[str], package: Optional[Package]
+) -> tuple[str, bytes]:
+    context = {}
+    if application is not None:
+        context = {"application": application, "package": package}
+    source = templates.get_template(script).render(context).encode()
+    return (
+        blobs.digest(source),
+        gzip.compress(source, blobs.COMPRESS_LEVEL, mtime=0),
+    )
+
+
+def _cache_key(script: str, application: Optional[str]) -> tuple:
+    return (script, application, data_version("catalog"))
+
+
+async def warm_up() -> None:
+    """Render the scripts of the most recently published applications, and
+    those not rendered for any application.
+
+    This is only an optimisation: scripts that cannot be rendered now, for
+    instance as the database is unreachable, are rendered when requested, so
+    the error is logged and the application serves regardless.
+    """
+    try:
+        await _warm_up()
+    except Exception:
+        logger.exception("Could not warm the script cache up")
+
+
+async def _warm_up() -> None:
+    for script in SCRIPTS - set(RUNTIME_SCRIPTS.values()) - {"share.js"}:
+        _scripts.put(_cache_key(script, None), _render(script, None, None))
+
+    query = (
+        select(Package, User.username)
+        .join(LatestPackage, LatestPackage.package_id == Package.id)
+        .join(User, Package.owner_id == User.id)
+        .order_by(Package.published.desc())
+        .limit(settings.script_warm_up_count)
+    )
+    async with async_session() as session:
+        for package, username in (await session.exec(query)).all():
+            if (script := RUNTIME_SCRIPTS.get(package.runtime)) is None:
+                continue
+            application = f"{username}/{package.name}@{package.version}"
+            for name in (script, "share.js"):
+                _scripts.put(
+                    _cache_key(name, application), _render(name, application, package)
+                )
+
 
 @router.get("/js/{script}")
 async def javascript_template(
     request: Request,
     script: str,
     application: Optional[str] = None,
+    v: Optional[str] = None,
     session: Session = Depends(database_session),
 ):
-    """Template generator for Javascript."""
-    if application is not None:
-        pkgdef = parse_package_name(application)
-        if (
-            owner := (
-                await session.exec(select(User).where(User.username == pkgdef.user))
-            ).first()
-        ) is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Not a user"
-            )
-
-        query = (
-            select(Package)
-            .where(Package.name == pkgdef.package)
-            .where(Package.owner_id == owner.id)
-            .where(Package.version == pkgdef.version)
-        )
-        result = await session.exec(query)
-        if (db_package := result.first()) is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Not a package"
-            )
-        context = {"application": application, "package": db_package}
-    else:
-        context = {}
-
-    return templates.TemplateResponse(
-        request=request,
-        name=script,
-        context=context,
-        media_type="text/javascript",
+    """Template generator for Javascript.
+
+    `v` is the version of the script templates the page was rendered with.
+    """
+    if script not in SCRIPTS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No script")
+
+    key = _cache_key(script, application)
+    if (rendered := _scripts.get(key)) is None:
+        package = None
+        if application is not None:
+            query = select(Package)
+            if (package := await resolve_package(session, application, query)) is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Not a package"
+                )
+        rendered = _render(script, application, package)
+        _scripts.put(key, rendered)
+
+    (digest, source) = rendered
+    return compressed_response(
+        request,
+        digest,
+        source,
+        media_type="text/javascript; charset=utf-8",
+        cache_control=(
+            IMMUTABLE if v == SCRIPT_VERSION and application is None else REVALIDATE
+        ),
     )
@@ -0,0 +1,12 @@
+"""Loader options declaring which relationships and deferred columns a page uses."""
+
+from sqlalchemy.orm import selectinload
+
+from jinet.models import Package
+
+# A package card in the catalog.
+PACKAGE_CARD = (
+    selectinload(Package.owner),
+    selectinload(Package.tags),
+    selectinload(Package.ratings),
+)
@@ -0,0 +1,59 @@
+"""Package logo thumbnails.
+
+Logos are scaled down to a fixed size when a package is submitted, and kept in
+their own small table next to the original in the blob store, so a page of
+packages can show them without touching the blob store.
+"""
+
+from io import BytesIO
+from typing import Optional
+
+from fastapi import HTTPException, status
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from jinet import blobs
+from jinet.models import LogoThumbnail
+
+# Thumbnails fit in a square this many pixels wide, twice what is displayed
+# for high density screens.
+THUMBNAIL_SIZE = 128
+
+THUMBNAIL_MIME = "image/webp"
+
+# Vector images stay as they are, at any size.
+_VECTOR_MIMES = {"image/svg+xml"}
+
+
+def _thumbnail(data: bytes) -> bytes:
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            thumbnail = BytesIO()
+            image.convert("RGBA").save(thumbnail, "WEBP", quality=90, method=6)
+            return thumbnail.getvalue()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as err:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="The logo is not an image."
+        ) from err
+
+
+async def make_thumbnail(session: Session, digest: str, mime: Optional[str]) -> None:
+    """Make the thumbnail of a logo in the blob store, unless it already exists."""
+    exists = await session.exec(
+        select(LogoThumbnail.digest).where(LogoThumbnail.digest == digest)
+    )
+    if exists.first() is not None:
+        return
+
+    data = await blobs.load(session, digest)
+    if mime not in _VECTOR_MIMES:
+        (data, mime) = (await run_in_threadpool(_thumbnail, data), THUMBNAIL_MIME)
+
+    await session.exec(
+        insert(LogoThumbnail)
+        .values(digest=digest, mime=mime, data=data)
+        .on_conflict_do_nothing(index_elements=["digest"])
+    )
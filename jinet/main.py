@@ -1,13 +1,15 @@
 """Main entry point."""
 
+from contextlib import asynccontextmanager
 from typing import Annotated, Optional
+import asyncio
 
 from fastapi import FastAPI, APIRouter, Depends, Request, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
-from sqlmodel import select, Session, asc, desc
+from sqlmodel import select, Session, asc
 
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.sessions import SessionMiddleware
@@ -17,13 +19,37 @@ from Secweb.CrossOriginOpenerPolicy import CrossOriginOpenerPolicy
 from Secweb.CrossOriginResourcePolicy import CrossOriginResourcePolicy
 from Secweb.ContentSecurityPolicy import ContentSecurityPolicy
 
-from jinet import auth, data, js, packages, requests, share, users
+from jinet import (
+    admin,
+    auth,
+    data,
+    js,
+    maintenance,
+    packages,
+    requests,
+    share,
+    uploads,
+    users,
+)
 from jinet.config import settings
 from jinet.db import database_session
-from jinet.models import SampleData, User, PermissionRequest, Package
+from jinet.models import PermissionRequest, SampleData, User
 from jinet.templates import templates
 
-app = FastAPI(title="JINet")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm caches up in the background and run the maintenance jobs while
+    serving."""
+    warming = asyncio.create_task(js.warm_up())
+    try:
+        async with maintenance.lifespan(app):
+            yield
+    finally:
+        warming.cancel()
+
+
+app = FastAPI(title="JINet", lifespan=lifespan)
 app.add_middleware(SessionMiddleware, secret_key=settings.secret_key)
 app.add_middleware(
     ContentSecurityPolicy,
@@ -72,12 +98,14 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 api_router = APIRouter()
 api_router.include_router(auth.router)
+api_router.include_router(admin.router, prefix="/admin")
 api_router.include_router(packages.router, prefix="/packages")
 api_router.include_router(data.router, prefix="/data")
 api_router.include_router(requests.router, prefix="/requests")
 api_router.include_router(js.router)
 api_router.include_router(share.router)
 api_router.include_router(users.router, prefix="/users")
+api_router.include_router(uploads.router, prefix="/uploads")
 app.include_router(api_router)
 
 
@@ -87,6 +115,13 @@ async def requires_login_exception_handler(request, exception):
     return RedirectResponse(request.url_for("login"))
 
 
+@app.exception_handler(uploads.UploadError)
+async def upload_exception_handler(request, exception):
+    return JSONResponse(
+        content={"detail": exception.detail}, status_code=exception.status_code
+    )
+
+
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request, exception):
     return HTMLResponse(
@@ -139,11 +174,18 @@ async def contribute(
 ):
     """Documentation for createing a package."""
     request.session["from"] = "/contribute"
-    select
+    context = await auth.user_in_context(request, session)
+    if (user := context.get("user")) is not None and not user.can_upload:
+        query = (
+            select(PermissionRequest.status)
+            .where(PermissionRequest.user_id == user.id)
+            .where(PermissionRequest.permission == "upload")
+        )
+        context["upload_request"] = (await session.exec(query)).first()
     return templates.TemplateResponse(
         request=request,
         name="contribute.html",
-        context=await auth.user_in_context(request, session),
+        context=context,
     )
 
 
@@ -156,7 +198,7 @@ async def data(
     """Upload example data formats."""
     request.session["from"] = "/data"
     query = (
-        select(SampleData)
+        select(SampleData.id, SampleData.name, SampleData.mime, SampleData.size)
         .order_by(asc(SampleData.id))
         .where(SampleData.id >= since)
         .limit(10)
@@ -170,34 +212,10 @@ async def data(
 
 
 @app.get("/admin", response_class=HTMLResponse)
-async def admin(
-    request: Request,
-    session: Annotated[Session, Depends(database_session)],
-    admin: Annotated[User, Depends(auth.current_admin)],
+async def admin_page(
+    request: Request, admin: Annotated[User, Depends(auth.current_admin)]
 ):
-    perm_requests = (await session.exec(select(PermissionRequest))).all()
-    users = (await session.exec(select(User))).all()
-    apps = (
-        await session.exec(
-            select(Package)
-            .distinct(Package.name, Package.owner_id)
-            .order_by(
-                Package.name,
-                Package.owner_id,
-                desc(Package.version),
-            )
-        )
-    ).all()
-    sampledata = (await session.exec(select(SampleData))).all()
-
+    """Lay out the admin panels, which load their own rows, see jinet.admin."""
     return templates.TemplateResponse(
-        request=request,
-        name="admin.html",
-        context={
-            "user": admin,
-            "requests": perm_requests,
-            "users": users,
-            "apps": apps,
-            "sampledata": sampledata,
-        },
+        request=request, name="admin.html", context={"user": admin}
     )
@@ -0,0 +1,133 @@
+"""Scheduled maintenance of the database.
+
+Login tokens, shares and uploads expire after their configured time to live,
+and blobs that nothing refers to any more are vacuumed in batches. Every
+worker process schedules the jobs, and an advisory lock makes sure only one of
+them runs each job at a time.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from sqlmodel import Session, delete, func, select
+
+from jinet import auth, blobs, share
+from jinet.config import settings
+from jinet.db import async_session
+from jinet.models import Blob, ShareData, Upload, UserToken
+
+
+def _ago(seconds: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=seconds)
+
+
+async def _exclusively(session: Session, job: str) -> bool:
+    """Lock a job until the end of the transaction, unless another worker has."""
+    lock = func.pg_try_advisory_xact_lock(func.hashtext(f"jinet.maintenance.{job}"))
+    return (await session.exec(select(lock))).one()
+
+
+async def expire_tokens() -> None:
+    """Log out sessions whose token is older than token_ttl."""
+    async with async_session() as session:
+        if not await _exclusively(session, "tokens"):
+            return
+        expired = await session.exec(
+            delete(UserToken)
+            .where(UserToken.created < _ago(settings.token_ttl))
+            .returning(UserToken.token)
+        )
+        tokens = expired.scalars().all()
+        await session.commit()
+
+    for token in tokens:
+        auth.forget_token(token)
+
+
+async def expire_shares() -> None:
+    """Delete shares older than share_ttl, leaving their data to vacuum_blobs."""
+    async with async_session() as session:
+        if not await _exclusively(session, "shares"):
+            return
+        expired = await session.exec(
+            delete(ShareData)
+            .where(ShareData.created < _ago(settings.share_ttl))
+            .returning(ShareData.reference)
+        )
+        references = expired.scalars().all()
+        await session.commit()
+
+    for reference in references:
+        share.forget_page(reference)
+
+
+async def expire_uploads() -> None:
+    """Delete uploads, and their chunks, not used within upload_ttl."""
+    async with async_session() as session:
+        if not await _exclusively(session, "uploads"):
+            return
+        await session.exec(
+            delete(Upload).where(Upload.created < _ago(settings.upload_ttl))
+        )
+        await session.commit()
+
+
+async def vacuum_blobs() -> int:
+    """Delete blobs that nothing refers to, a batch per transaction.
+
+    Recent blobs are spared, as they may be about to be referred to. Returns
+    the number of blobs deleted.
+    """
+    unreferenced = [
+        ~select(digest).where(digest == Blob.digest).exists()
+        for (digest, _) in blobs.REFERENCES
+    ]
+    batch = (
+        select(Blob.digest)
+        .where(Blob.created < _ago(settings.blob_grace_period))
+        .where(*unreferenced)
+        .limit(settings.blob_vacuum_batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+    deleted = 0
+    while True:
+        async with async_session() as session:
+            if not await _exclusively(session, "blobs"):
+                return deleted
+            result = await session.exec(
+                delete(Blob).where(Blob.digest.in_(batch.scalar_subquery()))
+            )
+            await session.commit()
+
+        deleted += result.rowcount
+        if result.rowcount < settings.blob_vacuum_batch_size:
+            return deleted
+
+
+def scheduler() -> AsyncIOScheduler:
+    """A scheduler running every maintenance job each maintenance_interval."""
+    jobs = AsyncIOScheduler(timezone=timezone.utc)
+    for job in (expire_tokens, expire_shares, expire_uploads, vacuum_blobs):
+        jobs.add_job(
+            job,
+            "interval",
+            seconds=settings.maintenance_interval,
+            jitter=min(60, settings.maintenance_interval),
+            coalesce=True,
+            max_instances=1,
+        )
+    return jobs
+
+
+@asynccontextmanager
+async def lifespan(app) -> AsyncIterator[None]:
+    """Run the maintenance jobs while the application is serving."""
+    jobs = scheduler()
+    jobs.start()
+    try:
+        yield
+    finally:
+        jobs.shutdown(wait=False)
@@ -1,13 +1,30 @@
-"""Database tables."""
+"""Database tables.
+
+Relationships are never loaded implicitly and large columns are deferred: a
+query asks for what it needs with the loader options in jinet.loading.
+Accessing anything else raises rather than issuing a query.
+"""
 
 from typing import List, Optional
 from datetime import datetime, timezone
 import uuid as uuid_pkg
 
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, LargeBinary, UniqueConstraint
+from sqlmodel.sql.sqltypes import AutoString
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    UniqueConstraint,
+    Uuid,
+)
+from sqlalchemy.orm import deferred
 from sqlalchemy.types import TIMESTAMP
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 
 
 class UserBase(SQLModel):
@@ -15,29 +32,33 @@ class UserBase(SQLModel):
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column=Column("created", type_=TIMESTAMP(timezone=True), nullable=False),
     )
-    username: Optional[str] = Field(nullable=True, default=None)
+    username: Optional[str] = Field(nullable=True, default=None, index=True)
     role: str = Field(nullable=False)
     picture: str = Field(nullable=False)
     sub: str = Field(nullable=False, index=True)
     can_upload: bool = Field(default=False, nullable=False)
+    # Bytes of storage the user may use, when not the default storage_quota.
+    storage_quota: Optional[int] = Field(
+        default=None, sa_column=Column("storage_quota", BigInteger, nullable=True)
+    )
 
 
 class User(UserBase, table=True):
     id: int = Field(nullable=False, primary_key=True)
     packages: List["Package"] = Relationship(
-        back_populates="owner", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="owner", sa_relationship_kwargs={"lazy": "raise"}
     )
     sample_data: List["SampleData"] = Relationship(
-        back_populates="owner", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="owner", sa_relationship_kwargs={"lazy": "raise"}
     )
     permission_requests: List["PermissionRequest"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise"}
     )
     shared: List["ShareData"] = Relationship(
-        back_populates="owner", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="owner", sa_relationship_kwargs={"lazy": "raise"}
     )
     sessions: list["UserToken"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise"}
     )
 
 
@@ -45,20 +66,48 @@ class UserToken(SQLModel, table=True):
     """An opaque login token supplied to a client."""
 
     id: int = Field(nullable=False, primary_key=True)
-    token: str = Field(nullable=False)
+    token: str = Field(nullable=False, unique=True, index=True)
     created: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column=Column("created", type_=TIMESTAMP(timezone=True), nullable=False),
     )
     user_id: int = Field(foreign_key="user.id")
     user: User = Relationship(
-        back_populates="sessions", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="sessions", sa_relationship_kwargs={"lazy": "raise"}
+    )
+
+
+_blob_data = Column("data", LargeBinary, nullable=False)
+
+
+class Blob(SQLModel, table=True):
+    """Content-addressed binary data, keyed by the SHA-256 digest of its contents.
+
+    Compressible data is stored gzipped, as recorded by its encoding, and is
+    `stored_size` bytes long in the table. The digest and size are always those
+    of the original data.
+    """
+
+    __mapper_args__ = {"properties": {"data": deferred(_blob_data, raiseload=True)}}
+
+    digest: str = Field(nullable=False, primary_key=True)
+    size: int = Field(nullable=False)
+    encoding: str = Field(
+        default="identity",
+        nullable=False,
+        sa_column_kwargs={"server_default": "identity"},
+    )
+    stored_size: int = Field(nullable=False)
+    data: bytes = Field(sa_column=_blob_data)
+    created: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column("created", type_=TIMESTAMP(timezone=True), nullable=False),
     )
 
 
 class PackageBase(SQLModel):
     name: str
-    data: bytes = Field(sa_column=Column("data", LargeBinary))
+    data_digest: str = Field(foreign_key="blob.digest", nullable=False, index=True)
     published: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column=Column(
@@ -73,43 +122,135 @@ class PackageBase(SQLModel):
     runtime: str
     interface: dict = Field(sa_column=Column("interface", JSONB, nullable=False))
     reviewed: bool = Field(default=False)
-    logo: Optional[bytes] = Field(sa_column=Column("logo", LargeBinary, nullable=True))
+    logo_digest: Optional[str] = Field(
+        default=None, foreign_key="blob.digest", nullable=True, index=True
+    )
     logo_mime: Optional[str] = Field(default=None)
 
 
+class LogoThumbnail(SQLModel, table=True):
+    """A small, fixed size version of a package logo, see jinet.logos.
+
+    It is keyed by the digest of the original logo in the blob store, and goes
+    when the original does.
+    """
+
+    __tablename__ = "logo_thumbnail"
+
+    digest: str = Field(
+        sa_column=Column(
+            AutoString,
+            ForeignKey("blob.digest", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    mime: str = Field(nullable=False)
+    data: bytes = Field(sa_column=Column("data", LargeBinary, nullable=False))
+
+
+class PackageTag(SQLModel, table=True):
+    package_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("package.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    tag_id: int = Field(foreign_key="tag.id", primary_key=True, index=True)
+
+
+# The full-text search vector of a package, see jinet.search.
+_package_search = Column(
+    "search",
+    TSVECTOR,
+    Computed(
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(short_description, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+        persisted=True,
+    ),
+)
+
+
 class Package(PackageBase, table=True):
+    __table_args__ = (
+        Index("ix_package_owner_id_name_version", "owner_id", "name", "version"),
+        Index("ix_package_search", "search", postgresql_using="gin"),
+        Index(
+            "ix_package_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+    __mapper_args__ = {
+        "properties": {"search": deferred(_package_search, raiseload=True)}
+    }
+
     id: int = Field(nullable=False, primary_key=True)
+    search: Optional[str] = Field(default=None, sa_column=_package_search)
     owner_id: int = Field(foreign_key="user.id")
     owner: User = Relationship(
-        back_populates="packages", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="packages", sa_relationship_kwargs={"lazy": "raise"}
     )
     tags: List["Tag"] = Relationship(
-        back_populates="package",
+        back_populates="packages",
+        link_model=PackageTag,
         sa_relationship_kwargs={
-            "lazy": "selectin",
+            "lazy": "raise",
         },
     )
     ratings: List["Rating"] = Relationship(
         back_populates="package",
         sa_relationship_kwargs={
-            "lazy": "selectin",
+            "lazy": "raise",
         },
     )
     shares: List["ShareData"] = Relationship(
         back_populates="package",
         sa_relationship_kwargs={
-            "lazy": "selectin",
+            "lazy": "raise",
         },
     )
 
 
-class Tag(SQLModel, table=True):
+class LatestPackage(SQLModel, table=True):
+    """The latest version of each package, keyed and ordered by (name, owner).
+
+    A projection of the package table kept up to date by
+    jinet.packages.refresh_latest whenever a version is published or deleted.
+    """
+
+    __tablename__ = "latest_package"
+
     name: str = Field(nullable=False, primary_key=True)
-    package_id: int = Field(foreign_key="package.id", primary_key=True)
-    package: Package = Relationship(
+    owner_id: int = Field(foreign_key="user.id", primary_key=True)
+    package_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("package.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        )
+    )
+    version: int = Field(nullable=False)
+
+
+class Tag(SQLModel, table=True):
+    """A tag name, shared by every package version tagged with it.
+
+    `package_count` is the number of packages whose latest version carries the
+    tag, kept up to date by jinet.packages.refresh_tag_counts.
+    """
+
+    id: int = Field(nullable=False, primary_key=True)
+    name: str = Field(nullable=False, unique=True)
+    package_count: int = Field(default=0, nullable=False)
+    packages: List[Package] = Relationship(
         back_populates="tags",
+        link_model=PackageTag,
         sa_relationship_kwargs={
-            "lazy": "selectin",
+            "lazy": "raise",
         },
     )
 
@@ -120,22 +261,25 @@ class Rating(SQLModel, table=True):
     package: Package = Relationship(
         back_populates="ratings",
         sa_relationship_kwargs={
-            "lazy": "selectin",
+            "lazy": "raise",
         },
     )
     rating: int = Field(nullable=False)
 
 
 class SampleData(SQLModel, table=True):
+    """An example data file, `size` bytes of it in the blob store."""
+
     id: int = Field(nullable=False, primary_key=True)
-    data: bytes = Field(sa_column=Column("data", LargeBinary, nullable=False))
-    name: str = Field(nullable=False)
+    data_digest: str = Field(foreign_key="blob.digest", nullable=False, index=True)
+    name: str = Field(nullable=False, index=True)
     mime: str = Field(nullable=False)
+    size: int = Field(nullable=False)
     owner_id: int = Field(foreign_key="user.id")
     owner: User = Relationship(
         back_populates="sample_data",
         sa_relationship_kwargs={
-            "lazy": "selectin",
+            "lazy": "raise",
         },
     )
 
@@ -149,26 +293,29 @@ class PermissionRequest(SQLModel, table=True):
     user_id: int = Field(foreign_key="user.id")
     user: User = Relationship(
         back_populates="permission_requests",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
     )
 
 
 class ShareData(SQLModel, table=True):
-    """Stores encrypted data for sharing."""
+    """Stores encrypted data for sharing, `size` bytes of it in the blob store."""
 
     id: int = Field(nullable=False, primary_key=True)
-    reference: uuid_pkg.UUID = Field(default_factory=uuid_pkg.uuid4, nullable=False)
+    reference: uuid_pkg.UUID = Field(
+        default_factory=uuid_pkg.uuid4, nullable=False, unique=True, index=True
+    )
     output: str = Field(nullable=False)
     filename: Optional[str] = Field(nullable=True, default=None)
     checksum: str = Field(nullable=False)
-    data: str = Field(nullable=False)
+    data_digest: str = Field(foreign_key="blob.digest", nullable=False, index=True)
+    size: int = Field(nullable=False)
     owner_id: int = Field(foreign_key="user.id")
     owner: User = Relationship(
-        back_populates="shared", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="shared", sa_relationship_kwargs={"lazy": "raise"}
     )
     package_id: int = Field(foreign_key="package.id")
     package: Package = Relationship(
-        back_populates="shares", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="shares", sa_relationship_kwargs={"lazy": "raise"}
     )
     created: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
@@ -178,3 +325,62 @@ class ShareData(SQLModel, table=True):
             nullable=False,
         ),
     )
+
+
+class Upload(SQLModel, table=True):
+    """A file being uploaded in chunks, see jinet.uploads.
+
+    `digest` is set once every chunk has been received and the file has been
+    assembled into the blob store.
+    """
+
+    id: uuid_pkg.UUID = Field(default_factory=uuid_pkg.uuid4, primary_key=True)
+    kind: str = Field(nullable=False)
+    name: str = Field(nullable=False)
+    mime: str = Field(nullable=False)
+    size: int = Field(nullable=False)
+    received: int = Field(default=0, nullable=False)
+    digest: Optional[str] = Field(
+        default=None, foreign_key="blob.digest", nullable=True, index=True
+    )
+    owner_id: int = Field(foreign_key="user.id")
+    created: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(
+            "created",
+            type_=TIMESTAMP(timezone=True),
+            nullable=False,
+        ),
+    )
+
+
+_upload_chunk_data = Column("data", LargeBinary, nullable=False)
+_upload_chunk_compressed = Column("compressed", LargeBinary, nullable=True)
+
+
+class UploadChunk(SQLModel, table=True):
+    """The bytes of an upload starting at `offset`.
+
+    `compressed` is the chunk's part of the gzipped upload, when the upload is
+    being finalized and is worth compressing.
+    """
+
+    __mapper_args__ = {
+        "properties": {
+            "data": deferred(_upload_chunk_data, raiseload=True),
+            "compressed": deferred(_upload_chunk_compressed, raiseload=True),
+        }
+    }
+
+    upload_id: uuid_pkg.UUID = Field(
+        sa_column=Column(
+            Uuid,
+            ForeignKey("upload.id", ondelete="CASCADE"),
+            primary_key=True,
+        )
+    )
+    offset: int = Field(primary_key=True)
+    data: bytes = Field(sa_column=_upload_chunk_data)
+    compressed: Optional[bytes] = Field(
+        default=None, sa_column=_upload_chunk_compressed
+    )
@@ -1,9 +1,12 @@
 """CRUD operations on packages."""
 
-from typing import Annotated, Optional
+from typing import Annotated, Any, Optional, Sequence
 from dataclasses import dataclass
+import base64
 import json
 import math
+import uuid as uuid_pkg
+from urllib.parse import urlencode
 
 from fastapi import (
     APIRouter,
@@ -18,20 +21,39 @@ from fastapi import (
 )
 from fastapi.responses import HTMLResponse, RedirectResponse
 
-from sqlmodel import func, select, Session, desc, asc, delete
+from sqlalchemy import ColumnElement, Select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import func, select, Session, desc, delete, update
 
-from jinet import auth
-from jinet.templates import templates
+from jinet import auth, blobs, loading, logos, quotas, search, uploads
+from jinet.cache import TTLCache
+from jinet.config import settings
+from jinet.templates import data_changed, templates
 from jinet.db import database_session
-from jinet.models import Package, Tag, User
-from jinet.filesize import valid_content_len, read_upload_file
+from jinet.models import (
+    Blob,
+    LatestPackage,
+    LogoThumbnail,
+    Package,
+    PackageTag,
+    Tag,
+    User,
+)
+from jinet.filesize import valid_content_len
+from jinet.responses import (
+    IMMUTABLE,
+    blob_response,
+    etag,
+    not_modified,
+    not_modified_response,
+)
 
 router = APIRouter()
 
 PAGINATION_LIMIT = 12
 
 
-@dataclass
+@dataclass(frozen=True)
 class PackageName:
     """A fully qualified package name needs all of these fields.
 
@@ -57,98 +79,339 @@ def parse_package_name(name: str) -> Optional[PackageName]:
         return None
 
 
+_resolved: TTLCache[PackageName, int] = TTLCache(
+    settings.resolver_cache_size, settings.resolver_cache_ttl
+)
+
+
+async def resolve_package(session: Session, name: str, query: Select) -> Any:
+    """Run a query against the package with a fully qualified name.
+
+    The query selects whatever the caller needs from the package table, as long
+    as that includes the package id. Names are resolved with a single join on
+    the user table and the resulting ids are cached, so a repeated lookup is a
+    primary key lookup. A cached id whose package has since been deleted is
+    resolved again, as the name may have been reused.
+    """
+    if (pkgdef := parse_package_name(name)) is None:
+        return None
+
+    if (package_id := _resolved.get(pkgdef)) is not None:
+        result = await session.exec(query.where(Package.id == package_id))
+        if (row := result.first()) is not None:
+            return row
+        _resolved.pop(pkgdef)
+
+    result = await session.exec(
+        query.join(User, Package.owner_id == User.id)
+        .where(User.username == pkgdef.user)
+        .where(Package.name == pkgdef.package)
+        .where(Package.version == pkgdef.version)
+    )
+    if (row := result.first()) is not None:
+        _resolved.put(pkgdef, row.id)
+    return row
+
+
 @dataclass(frozen=True)
-class Page:
-    """Describes a page of applications that is paginated."""
+class Pagination:
+    """Where a page sits in a listing.
+
+    `previous` and `next` are the query strings of the neighbouring pages, or
+    None at either end of the listing.
+    """
 
     page: int
-    active: bool
-    offset: int
+    pages: int
+    previous: Optional[str]
+    next: Optional[str]
 
 
-@router.get("/list", response_class=HTMLResponse)
-async def listing(
-    request: Request,
-    offset: int = 0,
-    active: int = 1,
-    tag: Optional[str] = None,
-    term: Optional[str] = None,
-    session: Session = Depends(database_session),
-):
-    """Retrieve a paginated listing of all packages."""
-    if term == "":
-        term = None
+# Number of applications matching a (tag, term) filter.
+_counts: TTLCache[tuple[Optional[str], Optional[str]], int] = TTLCache(
+    settings.listing_count_cache_size, settings.listing_count_cache_ttl
+)
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode a position in the listing, its sort key, as an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
 
+
+@dataclass(frozen=True)
+class TagCount:
+    """A tag in the tag cloud and the number of packages carrying it."""
+
+    name: str
+    count: int
+
+
+# The tag cloud, under the key None.
+_tag_cloud: TTLCache[None, list[TagCount]] = TTLCache(1, settings.tag_cloud_cache_ttl)
+
+
+def _python_type(column: ColumnElement) -> type:
+    # Custom types such as sqlmodel's AutoString only wrap a standard type.
+    return getattr(column.type, "impl_instance", column.type).python_type
+
+
+def decode_cursor(cursor: str, key: Sequence[ColumnElement]) -> tuple:
+    """Decode a cursor produced by encode_cursor for a given sort key."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor))
+        if (
+            isinstance(values, list)
+            and len(values) == len(key)
+            and all(
+                isinstance(value, _python_type(column))
+                or (_python_type(column) is float and isinstance(value, int))
+                for (value, column) in zip(values, key)
+            )
+        ):
+            return tuple(values)
+    except (ValueError, TypeError):
+        pass
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bad cursor")
+
+
+async def keyset_page(
+    session: Session,
+    query: Select,
+    key: Sequence[ColumnElement],
+    after: Optional[str],
+    before: Optional[str],
+    page: int,
+    total: int,
+    filters: dict[str, Any],
+    limit: int = PAGINATION_LIMIT,
+) -> tuple[list, Pagination]:
+    """Fetch a page of a query's rows ordered by `key`, the page after or before a cursor.
+
+    The query must select the key columns last. `total` is the number of rows
+    the query matches and `filters` the query parameters the neighbouring
+    pages are fetched with besides their cursor.
+    """
+    if before is not None:
+        query = query.where(tuple_(*key) < tuple_(*decode_cursor(before, key)))
+        query = query.order_by(*(desc(column) for column in key))
+    else:
+        if after is not None:
+            query = query.where(tuple_(*key) > tuple_(*decode_cursor(after, key)))
+        query = query.order_by(*key)
+    rows = list((await session.exec(query.limit(limit + 1))).all())
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if before is not None:
+        rows.reverse()
+    has_previous = more if before is not None else after is not None
+    has_next = more if before is None else True
+
+    page = max(page, 1)
+    pagination = Pagination(
+        page=page,
+        pages=max(math.ceil(total / limit), 1),
+        previous=(
+            urlencode(
+                {"before": encode_cursor(*rows[0][-len(key) :]), "page": page - 1}
+                | filters
+            )
+            if has_previous and rows
+            else None
+        ),
+        next=(
+            urlencode(
+                {"after": encode_cursor(*rows[-1][-len(key) :]), "page": page + 1}
+                | filters
+            )
+            if has_next and rows
+            else None
+        ),
+    )
+    return (rows, pagination)
+
+
+def filter_packages(query: Select, tag: Optional[str], term: Optional[str]) -> Select:
+    """Restrict a query involving the package table to a tag and/or search term."""
     match (tag, term):
         case (None, None):
-            pkg_qry = (
-                select(Package)
-                .distinct(Package.name, Package.owner_id)
-                .order_by(
-                    Package.name,
-                    Package.owner_id,
-                    desc(Package.version),
-                )
-                .subquery()
-            )
+            return query
 
         case (tg, None):
-            pkg_qry = (
-                select(Package)
-                .distinct(Package.name, Package.owner_id)
-                .order_by(Package.name, Package.owner_id, desc(Package.version))
-                .where(Package.tags.any(Tag.name == tg))
-                .subquery()
-            )
+            return query.where(Package.tags.any(Tag.name == tg))
 
-        case (None, query):
-            pkg_qry = (
-                select(Package)
-                .distinct(Package.name, Package.owner_id)
-                .order_by(Package.name, Package.owner_id, desc(Package.version))
-                .where(
-                    Package.name.icontains(query)
-                    | Package.short_description.icontains(query)
-                    | Package.description.icontains(query)
-                )
-                .subquery()
-            )
+        case (None, query_term):
+            return query.where(search.matches(query_term))
 
-        case (tg, query):
-            pkg_qry = (
-                select(Package)
-                .distinct(Package.name, Package.owner_id)
-                .filter(Package.tags.any(Tag.name == tg))
-                .filter(Package.name.op("%")(query))
-                .order_by(Package.name, Package.owner_id, desc(Package.version))
-                .subquery()
+        case (tg, query_term):
+            return query.where(Package.tags.any(Tag.name == tg)).where(
+                search.matches(query_term)
             )
-    total = (await session.exec(select(func.count()).select_from(pkg_qry))).one()
 
-    packages = (
-        await session.exec(
-            select(Package)
-            .join(pkg_qry, Package.id == pkg_qry.c.id)
-            .order_by(asc(pkg_qry.c.id))
-            .offset(offset)
-            .limit(PAGINATION_LIMIT)
+
+def listing_order(term: Optional[str]) -> list[ColumnElement]:
+    """The key the package listing is sorted on, in ascending order.
+
+    Search results are listed best match first.
+    """
+    order = [LatestPackage.name, LatestPackage.owner_id]
+    if term is not None:
+        return [-search.rank(term)] + order
+    return order
+
+
+async def count_packages(
+    session: Session, tag: Optional[str], term: Optional[str]
+) -> int:
+    """Count the applications (not versions) matching a tag and/or search term."""
+    if (total := _counts.get((tag, term))) is not None:
+        return total
+
+    query = filter_packages(
+        select(func.count())
+        .select_from(LatestPackage)
+        .join(Package, Package.id == LatestPackage.package_id),
+        tag,
+        term,
+    )
+    total = (await session.exec(query)).one()
+    _counts.put((tag, term), total)
+    return total
+
+
+async def tag_cloud(session: Session) -> list[TagCount]:
+    """All tags carried by the latest version of some package, by name."""
+    if (tags := _tag_cloud.get(None)) is not None:
+        return tags
+
+    query = select(Tag.name, Tag.package_count).where(Tag.package_count > 0)
+    tags = [
+        TagCount(name, count)
+        for (name, count) in (await session.exec(query.order_by(Tag.name))).all()
+    ]
+    _tag_cloud.put(None, tags)
+    return tags
+
+
+async def package_tag_ids(session: Session, name: str, owner_id: int) -> list[int]:
+    """The ids of the tags carried by any version of a package."""
+    query = (
+        select(PackageTag.tag_id)
+        .distinct()
+        .join(Package, Package.id == PackageTag.package_id)
+        .where(Package.name == name)
+        .where(Package.owner_id == owner_id)
+    )
+    return list((await session.exec(query)).all())
+
+
+async def refresh_tag_counts(session: Session, tag_ids: list[int]) -> None:
+    """Recount the packages whose latest version carries each of these tags.
+
+    Call this after refresh_latest with the tags of every version of the
+    package that changed, including any version that was just removed.
+    """
+    if not tag_ids:
+        return
+
+    count = (
+        select(func.count())
+        .select_from(PackageTag)
+        .join(LatestPackage, LatestPackage.package_id == PackageTag.package_id)
+        .where(PackageTag.tag_id == Tag.id)
+        .scalar_subquery()
+    )
+    await session.exec(
+        update(Tag).where(Tag.id.in_(tag_ids)).values(package_count=count)
+    )
+
+
+async def refresh_latest(session: Session, name: str, owner_id: int) -> None:
+    """Point the latest_package projection at the newest version of a package.
+
+    Call this in the same transaction that adds or removes a version. Removing
+    the last version needs nothing more, as its projection row is deleted with
+    it by the foreign key.
+    """
+    newest = (
+        select(Package.name, Package.owner_id, Package.id, Package.version)
+        .where(Package.name == name)
+        .where(Package.owner_id == owner_id)
+        .order_by(desc(Package.version))
+        .limit(1)
+    )
+    upsert = insert(LatestPackage).from_select(
+        ["name", "owner_id", "package_id", "version"], newest
+    )
+    await session.exec(
+        upsert.on_conflict_do_update(
+            index_elements=["name", "owner_id"],
+            set_={
+                "package_id": upsert.excluded.package_id,
+                "version": upsert.excluded.version,
+            },
         )
-    ).all()
+    )
+
 
+def catalog_changed() -> None:
+    """Forget cached listing counts and fragments after a package is published
+    or deleted."""
+    _counts.clear()
+    _tag_cloud.clear()
+    data_changed("catalog")
+
+
+@router.get("/list", response_class=HTMLResponse)
+async def listing(
+    request: Request,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    page: int = 1,
+    tag: Optional[str] = None,
+    term: Optional[str] = None,
+    session: Session = Depends(database_session),
+):
+    """Retrieve a paginated listing of all packages.
+
+    Only the latest version of each application is listed, ordered by
+    (name, owner), the primary key of the latest_package projection, or by
+    relevance first when searching. Pages are addressed by a cursor on the sort
+    key rather than an offset, so every page costs the same to fetch however
+    deep it is.
+    """
+    if term == "":
+        term = None
+
+    key = listing_order(term)
+    query = filter_packages(
+        select(Package, *key).join(
+            LatestPackage, LatestPackage.package_id == Package.id
+        ),
+        tag,
+        term,
+    ).options(*loading.PACKAGE_CARD)
+    filters = {"tag": tag, "term": term}
+    filters = {k: v for (k, v) in filters.items() if v is not None}
+    (rows, pagination) = await keyset_page(
+        session,
+        query,
+        key,
+        after,
+        before,
+        page,
+        await count_packages(session, tag, term),
+        filters,
+    )
+    packages = [row[0] for row in rows]
+
+    tags = await tag_cloud(session)
     if tag is None:
-        tags = (await session.exec(select(Tag.name).distinct())).all()
         filtered_by_tag = False
     else:
-        tags = [tag]
+        tags = [t for t in tags if t.name == tag] or [TagCount(tag, 0)]
         filtered_by_tag = True
 
-    pages = [
-        Page(page=p + 1, active=(p + 1) == active, offset=p * PAGINATION_LIMIT)
-        for p in range(math.ceil(total / PAGINATION_LIMIT))
-    ]
-
-    term_options = {} if term is None else {"term": term}
-    tag_options = {} if tag is None else {"tag": tag}
     return templates.TemplateResponse(
         request=request,
         name="package-list.html",
@@ -156,10 +419,9 @@ async def listing(
             "packages": packages,
             "tags": tags,
             "filtered_by_tag": filtered_by_tag,
-            "pages": pages,
+            "pagination": pagination,
         }
-        | term_options
-        | tag_options,
+        | filters,
     )
 
 
@@ -179,7 +441,6 @@ async def validate(
     request: Request,
     runtime: Annotated[str, Form()],
     package_name: Annotated[str, Form(alias="package-name")],
-    package_file: Annotated[UploadFile, File(alias="package-file")],
     parameters: Annotated[str, Form()],
     output: Annotated[str, Form()],
     content_size: Annotated[int, Depends(valid_content_len)],
@@ -189,7 +450,12 @@ async def validate(
     package_description: Annotated[
         Optional[str], Form(alias="package-description")
     ] = None,
+    package_file: Annotated[Optional[UploadFile], File(alias="package-file")] = None,
+    package_upload: Annotated[
+        Optional[uuid_pkg.UUID], Form(alias="package-upload")
+    ] = None,
     package_logo: Annotated[Optional[UploadFile], File(alias="package-logo")] = None,
+    logo_upload: Annotated[Optional[uuid_pkg.UUID], Form(alias="logo-upload")] = None,
     package_tags: Annotated[Optional[str], Form(alias="package-tags")] = None,
     entrypoint: Annotated[Optional[str], Form()] = None,
 ):
@@ -207,24 +473,54 @@ async def validate(
             context={"user": owner, "error": str(err)},
         )
 
-    # Check file size by actually reading it.
-    file_buffer = read_upload_file(package_file)
-    if package_logo is not None:
-        logo_buffer = read_upload_file(package_logo)
+    await quotas.check_quota(
+        session,
+        owner,
+        sum(upload.size for upload in (package_file, package_logo) if upload),
+    )
+
+    # Check file size by actually reading it, on its way into the blob store.
+    # Larger files are sent beforehand as resumable uploads.
+    if package_upload is not None:
+        data_digest = (
+            await uploads.take(session, package_upload, owner, "package")
+        ).digest
+    elif package_file is not None:
+        data_digest = await blobs.store_upload(
+            session, package_file, settings.max_package_size, compress=True
+        )
+    else:
+        return templates.TemplateResponse(
+            request=request,
+            name="package-validate.html",
+            context={"user": owner, "error": "No package file"},
+        )
+
+    if logo_upload is not None:
+        logo = await uploads.take(session, logo_upload, owner, "logo")
+        logo_digest = logo.digest
+        logo_mime = logo.mime
+    elif package_logo is not None:
+        logo_digest = await blobs.store_upload(
+            session,
+            package_logo,
+            settings.max_logo_size,
+            compress=blobs.compressible(package_logo.content_type),
+        )
         logo_mime = package_logo.content_type
     else:
-        logo_buffer = None
+        logo_digest = None
         logo_mime = None
+    if logo_digest is not None:
+        await logos.make_thumbnail(session, logo_digest, logo_mime)
 
     # Does this user already have a package by this name
     query = (
-        select(Package)
-        .where(Package.name == package_name)
-        .where(Package.owner_id == owner.id)
-        .order_by(desc(Package.version))
+        select(LatestPackage.version)
+        .where(LatestPackage.name == package_name)
+        .where(LatestPackage.owner_id == owner.id)
     )
-    results = await session.exec(query)
-    previous_version = results.first()
+    previous_version = (await session.exec(query)).first()
 
     # Get ready to insert into the database
     interface = {
@@ -233,27 +529,44 @@ async def validate(
         "output": output,
     }
 
-    tags = (
-        [Tag(name=tag.strip()) for tag in package_tags.split(",")]
+    tag_names = (
+        {tag.strip() for tag in package_tags.split(",")} - {""}
         if package_tags is not None
-        else []
+        else set()
     )
+    if tag_names:
+        await session.exec(
+            insert(Tag)
+            .values([{"name": name, "package_count": 0} for name in tag_names])
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        tags = list(
+            (await session.exec(select(Tag).where(Tag.name.in_(tag_names)))).all()
+        )
+    else:
+        tags = []
 
     package = Package(
         name=package_name,
-        data=file_buffer,
+        data_digest=data_digest,
         short_description=package_headline,
         description=package_description,
-        version=previous_version.version + 1 if previous_version is not None else 1,
+        version=previous_version + 1 if previous_version is not None else 1,
         runtime=runtime,
         interface=interface,
-        logo=logo_buffer,
+        logo_digest=logo_digest,
         logo_mime=logo_mime,
-        owner=owner,
+        owner_id=owner.id,
         tags=tags,
     )
     session.add(package)
+    await session.flush()
+    await refresh_latest(session, package.name, package.owner_id)
+    await refresh_tag_counts(
+        session, await package_tag_ids(session, package.name, package.owner_id)
+    )
     await session.commit()
+    catalog_changed()
     await session.refresh(package)
     return templates.TemplateResponse(
         request=request,
@@ -269,22 +582,10 @@ async def run(
     session: Annotated[Session, Depends(database_session)],
 ):
     """Run a package in the users browser."""
-    pkgdef = parse_package_name(package)
-    owner = (
-        await session.exec(select(User).where(User.username == pkgdef.user))
-    ).first()
-    if owner is None:
+    db_package = await resolve_package(session, package, select(Package))
+    if db_package is None:
         return RedirectResponse(request.url_for("packages"))
 
-    query = (
-        select(Package)
-        .where(Package.name == pkgdef.package)
-        .where(Package.owner_id == owner.id)
-        .where(Package.version == pkgdef.version)
-    )
-    result = await session.exec(query)
-    db_package = result.first()
-
     match db_package.runtime:
         case "python-runtime":
             return templates.TemplateResponse(
@@ -311,27 +612,22 @@ async def file(
     session: Annotated[Session, Depends(database_session)],
 ):
     """Get the package data file from the database."""
-    pkgdef = parse_package_name(package)
-    owner = (
-        await session.exec(select(User).where(User.username == pkgdef.user))
-    ).first()
-    if owner is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not a user")
-
-    query = (
-        select(Package)
-        .where(Package.name == pkgdef.package)
-        .where(Package.owner_id == owner.id)
-        .where(Package.version == pkgdef.version)
-    )
-    result = await session.exec(query)
-    db_package = result.first()
-    if db_package is None:
+    query = select(
+        Package.id, Blob.digest, Blob.size, Blob.encoding, Blob.stored_size
+    ).join(Blob, Package.data_digest == Blob.digest)
+    if (blob := await resolve_package(session, package, query)) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Not a package"
         )
 
-    return Response(content=db_package.data, media_type="text/x-python")
+    return blob_response(
+        request,
+        blob.digest,
+        blob.size,
+        media_type="text/x-python",
+        encoding=blob.encoding,
+        stored_size=blob.stored_size,
+    )
 
 
 @router.get("/logo")
@@ -341,32 +637,86 @@ async def logo(
     session: Annotated[Session, Depends(database_session)],
 ):
     """Get a package logo if one exists."""
-    pkgdef = parse_package_name(package)
-    if (
-        owner := (
-            await session.exec(select(User).where(User.username == pkgdef.user))
-        ).first()
-    ) is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not a user")
-
-    query = (
-        select(Package)
-        .where(Package.name == pkgdef.package)
-        .where(Package.owner_id == owner.id)
-        .where(Package.version == pkgdef.version)
-    )
-    result = await session.exec(query)
-    if (db_package := result.first()) is None:
+    query = select(
+        Package.id,
+        Package.logo_digest,
+        Package.logo_mime,
+        Blob.size,
+        Blob.encoding,
+        Blob.stored_size,
+    ).outerjoin(Blob, Package.logo_digest == Blob.digest)
+    if (db_package := await resolve_package(session, package, query)) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Not a package"
         )
 
-    if db_package.logo is None:
+    if db_package.logo_digest is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No logo for this package"
         )
 
-    return Response(content=db_package.logo, media_type=db_package.logo_mime)
+    return blob_response(
+        request,
+        db_package.logo_digest,
+        db_package.size,
+        media_type=db_package.logo_mime,
+        encoding=db_package.encoding,
+        stored_size=db_package.stored_size,
+    )
+
+
+@router.get("/logos/{digest}")
+async def logo_thumbnail(
+    request: Request,
+    digest: str,
+    session: Annotated[Session, Depends(database_session)],
+):
+    """Get the thumbnail of a package logo, by the digest of the logo.
+
+    Thumbnails of logos submitted before thumbnails existed are made on demand.
+    """
+    headers = {"ETag": etag(digest), "Cache-Control": IMMUTABLE}
+    if not_modified(request, headers["ETag"]):
+        return not_modified_response(headers)
+
+    query = select(LogoThumbnail.mime, LogoThumbnail.data).where(
+        LogoThumbnail.digest == digest
+    )
+    if (thumbnail := (await session.exec(query)).first()) is None:
+        logo = (
+            await session.exec(
+                select(Package.id, Package.logo_mime)
+                .where(Package.logo_digest == digest)
+                .limit(1)
+            )
+        ).first()
+        if logo is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No such logo"
+            )
+        await logos.make_thumbnail(session, digest, logo.logo_mime)
+        await session.commit()
+        thumbnail = (await session.exec(query)).one()
+
+    return Response(thumbnail.data, media_type=thumbnail.mime, headers=headers)
+
+
+def app_rows() -> Select:
+    """Select the columns a row of a table of applications shows, see
+    app-row.html."""
+    return (
+        select(
+            Package.id,
+            User.username,
+            Package.name,
+            Package.runtime,
+            Package.version,
+            Package.published,
+            Blob.size,
+        )
+        .join(User, Package.owner_id == User.id)
+        .join(Blob, Package.data_digest == Blob.digest)
+    )
 
 
 @router.delete("/delete/{package_id}", response_class=HTMLResponse)
@@ -375,8 +725,13 @@ async def delete_package(
     package_id: int,
     session: Annotated[Session, Depends(database_session)],
     user: Annotated[User, Depends(auth.current_user)],
+    detailed: bool = False,
 ):
-    """Delete a package from the database."""
+    """Delete a package from the database.
+
+    The row of the package in a table of applications is replaced with that of
+    its newest remaining version, `detailed` as the table is.
+    """
     if (
         package := (
             await session.exec(select(Package).where(Package.id == package_id))
@@ -392,36 +747,26 @@ async def delete_package(
             status_code=status.HTTP_400_UNAUTHORIZED, detail="Unauthorized"
         )
 
+    tag_ids = await package_tag_ids(session, package.name, package.owner_id)
     # Delete the tags
-    await session.exec(delete(Tag).where(Tag.package_id == package_id))
+    await session.exec(delete(PackageTag).where(PackageTag.package_id == package_id))
     # Delete the app
     await session.exec(delete(Package).where(Package.id == package_id))
+    await refresh_latest(session, package.name, package.owner_id)
+    await refresh_tag_counts(session, tag_ids)
     await session.commit()
+    catalog_changed()
 
     app = (
         await session.exec(
-            select(Package)
-            .distinct(Package.name, Package.owner_id)
-            .where(Package.name == package.name)
-            .where(Package.owner_id == user.id)
-            .order_by(
-                Package.name,
-                Package.owner_id,
-                desc(Package.version),
-            )
+            app_rows()
+            .join(LatestPackage, LatestPackage.package_id == Package.id)
+            .where(LatestPackage.name == package.name)
+            .where(LatestPackage.owner_id == package.owner_id)
         )
     ).one_or_none()
-
-    if app is not None:
-        return f"""<tr id="app-{app.id}">
-        <td>{user.username}</td>
-        <td>{app.name}</td>
-        <td>{app.runtime}</td>
-        <td>{app.version}</td>
-        <td><button class="uk-button uk-button-danger uk-button-small"
-                    hx-delete="/packages/delete?package={user.username}/{app.name}@{app.version}"
-                    hx-target="#app-{app.id}"
-                    hx-swap="outerHTML">Delete</button>
-        </tr>"""
-
-    return "<tr><td>Deleted</td><td>Deleted</td><td>Deleted</td><td>Deleted</td><td>Deleted</td></tr>"
+    return templates.TemplateResponse(
+        request=request,
+        name="app-row.html",
+        context={"app": app, "detailed": detailed},
+    )
@@ -0,0 +1,57 @@
+"""Per-user storage quotas.
+
+A user's storage is what is kept in the blob store for the packages, sample
+data and shares they own and the uploads they have started, counting each blob
+once, as stored. Uploads still being received count for their full size.
+"""
+
+from fastapi import HTTPException, status
+from sqlmodel import Session, func, select, union
+
+from jinet.blobs import REFERENCES
+from jinet.config import settings
+from jinet.models import Blob, Upload, User
+
+
+def quota(user: User) -> int:
+    """The bytes of storage a user may use."""
+    if user.storage_quota is None:
+        return settings.storage_quota
+    return user.storage_quota
+
+
+async def storage_used(session: Session, user_id: int) -> int:
+    """The bytes of storage a user is using."""
+    referenced = union(
+        *(
+            select(digest.label("digest")).where(owner == user_id)
+            for (digest, owner) in REFERENCES
+        )
+    ).subquery()
+    stored = select(func.coalesce(func.sum(Blob.stored_size), 0)).join(
+        referenced, referenced.c.digest == Blob.digest
+    )
+    receiving = (
+        select(func.coalesce(func.sum(Upload.size), 0))
+        .where(Upload.owner_id == user_id)
+        .where(Upload.digest.is_(None))
+    )
+    return (
+        await session.exec(
+            select(stored.scalar_subquery() + receiving.scalar_subquery())
+        )
+    ).one()
+
+
+async def check_quota(
+    session: Session,
+    user: User,
+    size: int,
+    error: type[HTTPException] = HTTPException,
+) -> None:
+    """Throw unless a user has room to store another `size` bytes."""
+    if await storage_used(session, user.id) + size > quota(user):
+        raise error(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail="Storage quota exceeded.",
+        )
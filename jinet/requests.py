@@ -57,6 +57,7 @@ async def grant(
     session.add(user)
 
     await session.commit()
+    auth.forget_users()
     return "granted"
 
 
@@ -0,0 +1,179 @@
+"""HTTP responses for stored data."""
+
+from typing import Optional
+import functools
+import gzip
+import re
+
+from fastapi import Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from jinet import blobs
+
+# Content addressed by its digest, or by a reference that is never reused,
+# never changes, so browsers may keep what they fetched for as long as they like.
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Content that can change under the same URL is revalidated on every use. This
+# includes anything addressed by a package name: deleting the newest version of
+# a package lets its version number be published again, with other content.
+REVALIDATE = "public, no-cache"
+
+
+def etag(key: str, encoding: str = "identity") -> str:
+    """A strong entity tag for a blob, derived from its content hash.
+
+    Each content coding of a blob is a different representation, with its own tag.
+    """
+    if encoding == "identity":
+        return f'"{key}"'
+    return f'"{key}-{encoding}"'
+
+
+def accepts_encoding(request: Request, encoding: str) -> bool:
+    """Check whether the client accepts a content coding, by its Accept-Encoding."""
+    accepted = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        (coding, *params) = item.split(";")
+        quality = 1.0
+        for param in params:
+            (name, _, value) = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+
+def not_modified(request: Request, tag: str) -> bool:
+    """Check whether the client already holds the representation with this tag."""
+    if (header := request.headers.get("if-none-match")) is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function.
+    return tag in (
+        candidate.strip().removeprefix("W/") for candidate in header.split(",")
+    )
+
+
+def not_modified_response(headers: dict[str, str]) -> Response:
+    """A 304 response, with the headers of the representation the client holds
+    that can update its cache entry."""
+    headers = {k: v for (k, v) in headers.items() if k != "Content-Encoding"}
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def requested_range(request: Request, tag: str, size: int) -> Optional[range]:
+    """The single byte range of a blob the client asked for, if any.
+
+    Ranges that cannot be parsed, multiple ranges and ranges conditional on a
+    different entity are ignored, so the whole blob is sent. A range starting
+    past the end of the blob is empty, and cannot be satisfied.
+    """
+    if (header := request.headers.get("range")) is None:
+        return None
+    if (condition := request.headers.get("if-range")) is not None and condition != tag:
+        return None
+
+    if (spec := re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())) is None:
+        return None
+    (first, last) = spec.groups()
+    if first == "":
+        if last == "":
+            return None
+        # A suffix: the last so many bytes.
+        if int(last) == 0:
+            return range(0)
+        return range(max(size - int(last), 0), size)
+    if last != "" and int(last) < int(first):
+        return None
+    end = size if last == "" else min(int(last) + 1, size)
+    return range(int(first), max(end, int(first)))
+
+
+def blob_response(
+    request: Request,
+    key: str,
+    size: int,
+    media_type: str,
+    cache_control: str = REVALIDATE,
+    encoding: str = "identity",
+    stored_size: Optional[int] = None,
+) -> Response:
+    """Stream a blob from the blob store, or answer 304 if the client has it.
+
+    A compressed blob is sent as stored to clients that accept its encoding,
+    and decompressed on the way out to the others. A single byte range of the
+    blob can be requested, to fetch it progressively or resume a download:
+    ranges are always of the original data, as few clients can make use of a
+    slice of a gzip stream.
+    """
+    headers = {
+        "ETag": etag(key),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    content = functools.partial(blobs.stream, key)
+    if encoding != "identity":
+        headers["Vary"] = "Accept-Encoding"
+        if "range" not in request.headers and accepts_encoding(request, encoding):
+            headers["ETag"] = etag(key, encoding)
+            headers["Content-Encoding"] = encoding
+            size = stored_size
+        else:
+            content = functools.partial(blobs.stream_decompressed, key, stored_size)
+
+    if not_modified(request, headers["ETag"]):
+        return not_modified_response(headers)
+
+    if (part := requested_range(request, headers["ETag"], size)) is None:
+        return StreamingResponse(
+            content(start=0, size=size),
+            media_type=media_type,
+            headers=headers | {"Content-Length": str(size)},
+        )
+
+    if len(part) == 0:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers=headers | {"Content-Range": f"bytes */{size}"},
+        )
+
+    return StreamingResponse(
+        content(start=part.start, size=len(part)),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers
+        | {
+            "Content-Length": str(len(part)),
+            "Content-Range": f"bytes {part.start}-{part.stop - 1}/{size}",
+        },
+    )
+
+
+def compressed_response(
+    request: Request,
+    key: str,
+    compressed: bytes,
+    media_type: str,
+    cache_control: str = REVALIDATE,
+) -> Response:
+    """Send content gzipped ahead of time as is, or decompressed to clients
+    that do not accept gzip. `key` identifies the content, like a blob's."""
+    headers = {
+        "ETag": etag(key),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if gzipped := accepts_encoding(request, "gzip"):
+        headers |= {"ETag": etag(key, "gzip"), "Content-Encoding": "gzip"}
+
+    if not_modified(request, headers["ETag"]):
+        return not_modified_response(headers)
+
+    if gzipped:
+        return Response(compressed, media_type=media_type, headers=headers)
+    return Response(gzip.decompress(compressed), media_type=media_type, headers=headers)
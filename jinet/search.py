@@ -0,0 +1,33 @@
+"""Package search.
+
+A search term matches a package when it matches the full-text search vector
+of its name and descriptions, or when it is similar to the package name by
+trigrams so that partial and misspelt names are still found. Both are backed
+by GIN indexes on the package table.
+"""
+
+from sqlalchemy import ColumnElement, Float, cast
+from sqlmodel import func
+
+from jinet.models import Package
+
+# The text search configuration used to build and query Package.search.
+TEXT_SEARCH_CONFIG = "english"
+
+
+def _query(term: str) -> ColumnElement:
+    return func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, term)
+
+
+def matches(term: str) -> ColumnElement[bool]:
+    """Whether a package matches a search term."""
+    return Package.search.op("@@")(_query(term)) | Package.name.op("%")(term)
+
+
+def rank(term: str) -> ColumnElement[float]:
+    """How well a package matches a search term, higher is better."""
+    return cast(
+        func.ts_rank(Package.search, _query(term))
+        + func.similarity(Package.name, term),
+        Float,
+    )
@@ -1,59 +1,78 @@
 """ Share results. """
 
 from typing import Annotated, Optional
+import gzip
+import uuid as uuid_pkg
 
-from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    UploadFile,
+    status,
+)
 from fastapi.responses import RedirectResponse
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 
-from jinet import auth
+from jinet import auth, blobs, quotas
+from jinet.cache import TTLCache
+from jinet.config import settings
 from jinet.db import database_session
-from jinet.models import User, Package, ShareData
-from jinet.packages import parse_package_name
+from jinet.models import Blob, User, Package, ShareData
+from jinet.packages import resolve_package
+from jinet.responses import IMMUTABLE, blob_response, compressed_response
 from jinet.templates import templates
 
 router = APIRouter()
 
+# Shared result pages by reference, as their content hash and gzipped HTML.
+# A share never changes, so a page is rendered and compressed once.
+_pages: TTLCache[uuid_pkg.UUID, tuple[str, bytes]] = TTLCache(
+    settings.share_page_cache_size, settings.share_page_cache_ttl
+)
+
+
+def forget_page(reference: uuid_pkg.UUID) -> None:
+    """Stop serving the page of a share cached by this process."""
+    _pages.pop(reference)
+
 
 @router.post("/share")
 async def create_share(
     request: Request,
     application: str,
     output_type: Annotated[str, Form(alias="output-type")],
-    data: Annotated[str, Form(alias="output-data")],
+    data: Annotated[UploadFile, File(alias="output-data")],
     checksum: Annotated[str, Form()],
     session: Annotated[Session, Depends(database_session)],
     user: Annotated[User, Depends(auth.current_user)],
     filename: Annotated[Optional[str], Form()] = None,
 ):
-    """Create a share data entry in the database and generate a link in the response."""
+    """Create a share data entry in the database and generate a link in the response.
+
+    The result is encrypted by the browser and sent as a file, which is stored
+    as it is.
+    """
     if not user.can_upload:
         return RedirectResponse(request.url_for("index"))
 
-    pkgdef = parse_package_name(application)
-    if (
-        owner := (
-            await session.exec(select(User).where(User.username == pkgdef.user))
-        ).first()
-    ) is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not a user")
-
-    package_query = (
-        select(Package)
-        .where(Package.name == pkgdef.package)
-        .where(Package.owner_id == owner.id)
-        .where(Package.version == pkgdef.version)
-    )
-    if (package := (await session.exec(package_query)).first()) is None:
+    query = select(Package.id, Package.owner_id)
+    if (package := await resolve_package(session, application, query)) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Not a package"
         )
+    await quotas.check_quota(session, user, data.size)
 
     share = ShareData(
         filename=filename,
         checksum=checksum,
-        data=data,
-        owner_id=owner.id,
+        data_digest=await blobs.store_upload(session, data, settings.max_share_size),
+        size=data.size,
+        owner_id=user.id,
         package_id=package.id,
         output=output_type,
     )
@@ -71,21 +90,76 @@ async def create_share(
 @router.get("/shared/{reference}")
 async def retrieve_results(
     request: Request,
-    reference: str,
+    reference: uuid_pkg.UUID,
     session: Session = Depends(database_session),
 ):
-    """Display shared results."""
-    if (
-        shared := (
-            await session.exec(
-                select(ShareData).where(ShareData.reference == reference)
+    """Display shared results.
+
+    The page only describes the share: its encrypted data is fetched from
+    shared_data by the browser, to be decrypted there.
+    """
+    if (page := _pages.get(reference)) is None:
+        query = (
+            select(
+                ShareData.reference,
+                ShareData.output,
+                ShareData.filename,
+                ShareData.checksum,
+                ShareData.size,
+                ShareData.created,
+                User.username,
             )
-        ).first()
-    ) is None:
+            .join(User, ShareData.owner_id == User.id)
+            .where(ShareData.reference == reference)
+        )
+        if (shared := (await session.exec(query)).first()) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Unknown share."
+            )
+
+        html = (
+            templates.get_template("shared-result.html")
+            .render(request=request, share=shared)
+            .encode()
+        )
+        page = (
+            blobs.digest(html),
+            await run_in_threadpool(gzip.compress, html, blobs.COMPRESS_LEVEL, mtime=0),
+        )
+        _pages.put(reference, page)
+
+    (key, compressed) = page
+    return compressed_response(
+        request, key, compressed, media_type="text/html; charset=utf-8"
+    )
+
+
+@router.get("/shared/{reference}/data")
+async def shared_data(
+    request: Request,
+    reference: uuid_pkg.UUID,
+    session: Annotated[Session, Depends(database_session)],
+):
+    """Stream the encrypted data of a share, for the page to decrypt.
+
+    What a reference refers to never changes, so browsers can keep it.
+    """
+    query = (
+        select(Blob.digest, Blob.size, Blob.encoding, Blob.stored_size)
+        .join(ShareData, ShareData.data_digest == Blob.digest)
+        .where(ShareData.reference == reference)
+    )
+    if (blob := (await session.exec(query)).first()) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Unknown share."
         )
 
-    return templates.TemplateResponse(
-        request=request, name="shared-result.html", context={"share": shared}
+    return blob_response(
+        request,
+        blob.digest,
+        blob.size,
+        media_type="application/octet-stream",
+        cache_control=IMMUTABLE,
+        encoding=blob.encoding,
+        stored_size=blob.stored_size,
     )
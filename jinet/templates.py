@@ -1,8 +1,79 @@
-"""HTML Templating."""
+"""HTML Templating.
+
+Compiled templates are kept in a bytecode cache shared by worker processes,
+and template files are only checked for changes when template_auto_reload is
+set, for development.
+
+Parts of a template that are expensive to render and only depend on some data
+can be cached with the `cache` tag, keyed by the name of that data and any
+values that identify the fragment:
+
+    {% cache "catalog", package.id %}...{% endcache %}
+
+Call `data_changed` with the name of the data when it changes, to render such
+fragments again.
+"""
 
 from base64 import b64encode
+from collections import defaultdict
+from typing import Any, Callable
 
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from jinja2.parser import Parser
+from markupsafe import Markup
+
+from jinet.cache import TTLCache
+from jinet.config import settings
+
+# Rendered fragments by data name, data version and key.
+_fragments: TTLCache[tuple, Markup] = TTLCache(
+    settings.fragment_cache_size, settings.fragment_cache_ttl
+)
+
+# The version of each piece of data fragments depend on, in this process.
+_versions: defaultdict[str, int] = defaultdict(int)
+
+
+def data_version(data: str) -> int:
+    """The version of some data, which changes along with it."""
+    return _versions[data]
+
+
+def data_changed(data: str) -> None:
+    """Render the fragments that depend on some data again, as it has changed."""
+    _versions[data] += 1
+
+
+class FragmentCache(Extension):
+    """The `cache` tag, caching what it encloses."""
+
+    tags = {"cache"}
+
+    def parse(self, parser: Parser) -> nodes.Node:
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render", [nodes.List(args)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, args: list[Any], caller: Callable[[], str]) -> Markup:
+        (data, *key) = args
+        cache_key = (data, data_version(data), *key)
+        if (fragment := _fragments.get(cache_key)) is None:
+            fragment = Markup(caller())
+            _fragments.put(cache_key, fragment)
+        return fragment
+
 
-templates = Jinja2Templates(directory="templates")
+templates = Jinja2Templates(
+    directory="templates",
+    auto_reload=settings.template_auto_reload,
+    bytecode_cache=FileSystemBytecodeCache(settings.template_cache_dir),
+    extensions=[FragmentCache],
+)
 templates.env.filters["b64encode"] = b64encode
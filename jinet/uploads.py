@@ -0,0 +1,308 @@
+"""Resumable uploads of large files, sent in chunks.
+
+An upload is started with its kind, name and size, then its bytes are sent in
+order with one PUT per chunk at the offset the server has received up to,
+which the upload status reports when resuming. Finalizing with the SHA-256
+checksum of the whole file checks it a chunk at a time, then assembles the
+chunks into the blob store inside the database, so no worker ever holds more
+than one chunk in memory.
+
+Sample data is published when its upload is finalized. Package files and logos
+are referenced by their upload id when the package is submitted.
+"""
+
+from datetime import datetime, timezone
+from hashlib import sha256
+from typing import Annotated, Literal, Optional
+import uuid as uuid_pkg
+
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
+from sqlalchemy import LargeBinary, Select, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlmodel import Session, delete, func, select, update
+from starlette.concurrency import run_in_threadpool
+
+from jinet import auth, blobs, quotas
+from jinet.config import settings
+from jinet.db import database_session
+from jinet.models import Blob, SampleData, Upload, UploadChunk, User
+
+router = APIRouter()
+
+Kind = Literal["package", "logo", "sample-data"]
+
+
+class UploadError(HTTPException):
+    """An error from the upload API, reported as JSON with its status code."""
+
+
+def size_limit(kind: Kind) -> int:
+    """The largest file of a kind that can be uploaded."""
+    match kind:
+        case "package":
+            return settings.max_package_size
+        case "logo":
+            return settings.max_logo_size
+        case "sample-data":
+            return settings.max_sample_data_size
+
+
+def upload_status(upload: Upload) -> dict:
+    """Describe how far along an upload is."""
+    return {
+        "id": str(upload.id),
+        "kind": upload.kind,
+        "name": upload.name,
+        "size": upload.size,
+        "received": upload.received,
+        "chunk_size": settings.upload_chunk_size,
+        "digest": upload.digest,
+    }
+
+
+async def owned_upload(
+    session: Session,
+    upload_id: uuid_pkg.UUID,
+    owner: User,
+    error: type[HTTPException] = UploadError,
+) -> Upload:
+    """Get an upload belonging to a user, or throw."""
+    upload = (
+        await session.exec(
+            select(Upload)
+            .where(Upload.id == upload_id)
+            .where(Upload.owner_id == owner.id)
+        )
+    ).one_or_none()
+    if upload is None:
+        raise error(status_code=status.HTTP_404_NOT_FOUND, detail="No upload")
+    return upload
+
+
+async def take(
+    session: Session, upload_id: uuid_pkg.UUID, owner: User, kind: Kind
+) -> Upload:
+    """Use up a finalized upload of a given kind as part of another submission.
+
+    The upload is deleted when the caller's transaction commits; its blob is
+    left to whatever now refers to it.
+    """
+    upload = await owned_upload(session, upload_id, owner, HTTPException)
+    if upload.kind != kind or upload.digest is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload not finalized"
+        )
+    await session.delete(upload)
+    return upload
+
+
+def _digest_chunk(hasher, compressor, data: bytes, last: bool) -> Optional[bytes]:
+    hasher.update(data)
+    if compressor is None:
+        return None
+    compressed = compressor.compress(data)
+    if last:
+        compressed += compressor.flush()
+    return compressed
+
+
+async def digest_chunks(
+    session: Session, upload_id: uuid_pkg.UUID, compress: bool
+) -> tuple[str, int]:
+    """Hash the chunks of an upload, one at a time, and gzip them alongside
+    the original if `compress`.
+
+    Returns the SHA-256 digest of the upload and its compressed size. The
+    chunks are compressed as one stream, so that they still assemble into a
+    single gzip file.
+    """
+    offsets = (
+        await session.exec(
+            select(UploadChunk.offset)
+            .where(UploadChunk.upload_id == upload_id)
+            .order_by(UploadChunk.offset)
+        )
+    ).all()
+    hasher = sha256()
+    compressor = blobs.compressor() if compress else None
+    compressed_size = 0
+    for index, offset in enumerate(offsets):
+        where = (UploadChunk.upload_id == upload_id) & (UploadChunk.offset == offset)
+        data = (await session.exec(select(UploadChunk.data).where(where))).one()
+        compressed = await run_in_threadpool(
+            _digest_chunk, hasher, compressor, data, index == len(offsets) - 1
+        )
+        if compressed is not None:
+            await session.exec(
+                update(UploadChunk).where(where).values(compressed=compressed)
+            )
+            compressed_size += len(compressed)
+    return (hasher.hexdigest(), compressed_size)
+
+
+def assembled(upload_id: uuid_pkg.UUID, column) -> Select:
+    """The chunks of an upload, in order, as a single value."""
+    return select(
+        func.coalesce(
+            func.string_agg(
+                column,
+                aggregate_order_by(literal(b"", LargeBinary), UploadChunk.offset),
+            ),
+            literal(b"", LargeBinary),
+        )
+    ).where(UploadChunk.upload_id == upload_id)
+
+
+@router.post("/new")
+async def new(
+    kind: Annotated[Kind, Form()],
+    name: Annotated[str, Form()],
+    size: Annotated[int, Form(ge=0)],
+    session: Annotated[Session, Depends(database_session)],
+    owner: Annotated[User, Depends(auth.current_user)],
+    mime: Annotated[str, Form()] = "application/octet-stream",
+):
+    """Start a resumable upload."""
+    if not owner.can_upload:
+        raise UploadError(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+    if size > size_limit(kind):
+        raise UploadError(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File too large.",
+        )
+    await quotas.check_quota(session, owner, size, UploadError)
+
+    upload = Upload(kind=kind, name=name, mime=mime, size=size, owner_id=owner.id)
+    session.add(upload)
+    await session.commit()
+    return upload_status(upload)
+
+
+@router.get("/{upload_id}")
+async def progress(
+    upload_id: uuid_pkg.UUID,
+    session: Annotated[Session, Depends(database_session)],
+    owner: Annotated[User, Depends(auth.current_user)],
+):
+    """Get the status of an upload, to resume it."""
+    return upload_status(await owned_upload(session, upload_id, owner))
+
+
+@router.put("/{upload_id}/{offset}")
+async def put_chunk(
+    request: Request,
+    upload_id: uuid_pkg.UUID,
+    offset: int,
+    session: Annotated[Session, Depends(database_session)],
+    owner: Annotated[User, Depends(auth.current_user)],
+):
+    """Receive the chunk of an upload that starts at `offset`, sent as the body."""
+    upload = await owned_upload(session, upload_id, owner)
+    if upload.digest is not None or offset != upload.received:
+        raise UploadError(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Expected a chunk at offset {upload.received}",
+        )
+
+    data = bytearray()
+    async for part in request.stream():
+        data += part
+        if len(data) > settings.upload_chunk_size or offset + len(data) > upload.size:
+            raise UploadError(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Chunk too large.",
+            )
+    if not data:
+        raise UploadError(status_code=status.HTTP_400_BAD_REQUEST, detail="No data")
+
+    # Only one of two concurrent requests for the same offset moves it on.
+    result = await session.exec(
+        update(Upload)
+        .where(Upload.id == upload_id)
+        .where(Upload.received == offset)
+        .values(received=offset + len(data))
+    )
+    if result.rowcount != 1:
+        raise UploadError(
+            status_code=status.HTTP_409_CONFLICT, detail="Chunk already received"
+        )
+    session.add(UploadChunk(upload_id=upload_id, offset=offset, data=bytes(data)))
+    await session.commit()
+    await session.refresh(upload)
+    return upload_status(upload)
+
+
+@router.post("/{upload_id}/finalize")
+async def finalize(
+    upload_id: uuid_pkg.UUID,
+    checksum: Annotated[str, Form()],
+    session: Annotated[Session, Depends(database_session)],
+    owner: Annotated[User, Depends(auth.current_user)],
+):
+    """Assemble a completely received upload, checking its SHA-256 checksum."""
+    upload = await owned_upload(session, upload_id, owner)
+    if upload.digest is not None:
+        return upload_status(upload)
+
+    if upload.received != upload.size:
+        raise UploadError(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload incomplete"
+        )
+
+    compress = upload.size > 0 and blobs.compressible(upload.mime)
+    (digest, compressed_size) = await digest_chunks(session, upload_id, compress)
+    if digest != checksum.lower():
+        await session.exec(delete(Upload).where(Upload.id == upload_id))
+        await session.commit()
+        raise UploadError(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Checksum mismatch, upload discarded",
+        )
+
+    # The chunks are only assembled, once, into a blob not yet in the store,
+    # gzipped unless that does not make it any smaller.
+    if not await blobs.claim(session, digest):
+        (encoding, column, stored_size) = ("identity", UploadChunk.data, upload.size)
+        if compress and compressed_size < upload.size:
+            (encoding, column, stored_size) = (
+                "gzip",
+                UploadChunk.compressed,
+                compressed_size,
+            )
+        await session.exec(
+            insert(Blob)
+            .from_select(
+                ["digest", "size", "encoding", "stored_size", "data", "created"],
+                select(
+                    literal(digest),
+                    literal(upload.size),
+                    literal(encoding),
+                    literal(stored_size),
+                    assembled(upload_id, column).scalar_subquery(),
+                    literal(datetime.now(timezone.utc)),
+                ),
+            )
+            .on_conflict_do_update(
+                index_elements=["digest"], set_={"created": func.now()}
+            )
+        )
+    await session.exec(delete(UploadChunk).where(UploadChunk.upload_id == upload_id))
+    upload.digest = digest
+
+    if upload.kind == "sample-data":
+        session.add(
+            SampleData(
+                name=upload.name,
+                data_digest=digest,
+                mime=upload.mime,
+                size=upload.size,
+                owner_id=owner.id,
+            )
+        )
+        await session.delete(upload)
+    else:
+        session.add(upload)
+
+    await session.commit()
+    return upload_status(upload)
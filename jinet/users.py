@@ -5,11 +5,12 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse
 
-from sqlmodel import Session, select, desc
+from sqlmodel import Session, desc, select
 
 from jinet import auth
 from jinet.db import database_session
-from jinet.models import User, Package
+from jinet.packages import app_rows
+from jinet.models import LatestPackage, Package, SampleData, ShareData, User
 from jinet.templates import templates
 
 router = APIRouter()
@@ -21,15 +22,47 @@ async def user_me(
     session: Annotated[Session, Depends(database_session)],
     user: Annotated[User, Depends(auth.current_user)],
 ):
-    """Logged-in users data page."""
+    """Logged-in users data page.
+
+    Only the columns listed are selected, the sizes being recorded when the
+    data was uploaded.
+    """
     apps = (
         await session.exec(
-            select(Package)
-            .where(Package.owner_id == user.id)
-            .distinct(Package.name)
-            .order_by(Package.name, desc(Package.version))
+            app_rows()
+            .join(LatestPackage, LatestPackage.package_id == Package.id)
+            .where(LatestPackage.owner_id == user.id)
+            .order_by(LatestPackage.name)
+        )
+    ).all()
+    sample_data = (
+        await session.exec(
+            select(SampleData.id, SampleData.name, SampleData.mime, SampleData.size)
+            .where(SampleData.owner_id == user.id)
+            .order_by(SampleData.name)
+        )
+    ).all()
+    shared = (
+        await session.exec(
+            select(
+                ShareData.reference,
+                ShareData.filename,
+                ShareData.size,
+                ShareData.created,
+                Package.name,
+            )
+            .join(Package, ShareData.package_id == Package.id)
+            .where(ShareData.owner_id == user.id)
+            .order_by(desc(ShareData.created))
         )
     ).all()
     return templates.TemplateResponse(
-        request=request, name="me.html", context={"user": user, "apps": apps}
+        request=request,
+        name="me.html",
+        context={
+            "user": user,
+            "apps": apps,
+            "sample_data": sample_data,
+            "shared": shared,
+        },
     )
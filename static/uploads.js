@@ -0,0 +1,76 @@
+// Resumable chunked uploads, see jinet/uploads.py
+
+async function uploadRequest(method, url, body) {
+  const response = await fetch(url, { method, body });
+  if (!response.headers.get("Content-Type")?.startsWith("application/json")) {
+    throw new Error("Upload failed");
+  }
+  const result = await response.json();
+  if (!response.ok) {
+    throw new Error(result.detail);
+  }
+  return result;
+}
+
+async function sha256Hex(file) {
+  const hash = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(hash))
+    .map((b) => b.toString(16).padStart(2, "0"))
+    .join("");
+}
+
+// Upload a file in chunks, resuming an earlier attempt at the same file.
+async function uploadFile(file, kind, onProgress = () => {}) {
+  const key = `upload:${kind}:${file.name}:${file.size}:${file.lastModified}`;
+  let status = null;
+  const previous = localStorage.getItem(key);
+  if (previous !== null) {
+    try {
+      status = await uploadRequest("GET", `/uploads/${previous}`);
+    } catch {
+      localStorage.removeItem(key);
+    }
+  }
+  if (status === null) {
+    const form = new FormData();
+    form.append("kind", kind);
+    form.append("name", file.name);
+    form.append("size", file.size);
+    form.append("mime", file.type || "application/octet-stream");
+    status = await uploadRequest("POST", "/uploads/new", form);
+    localStorage.setItem(key, status.id);
+  }
+
+  while (status.received < status.size) {
+    onProgress(status.received, status.size);
+    const chunk = file.slice(status.received, status.received + status.chunk_size);
+    status = await uploadRequest(
+      "PUT",
+      `/uploads/${status.id}/${status.received}`,
+      chunk,
+    );
+  }
+  onProgress(status.size, status.size);
+
+  const form = new FormData();
+  form.append("checksum", await sha256Hex(file));
+  try {
+    return await uploadRequest("POST", `/uploads/${status.id}/finalize`, form);
+  } finally {
+    localStorage.removeItem(key);
+  }
+}
+
+async function uploadSampleData(form) {
+  const file = form.querySelector("input[type=file]").files[0];
+  const progress = form.querySelector("progress");
+  progress.hidden = false;
+  try {
+    await uploadFile(file, "sample-data", (received, size) => {
+      progress.value = size > 0 ? (100 * received) / size : 100;
+    });
+    form.outerHTML = `<div class="uk-alert-success" uk-alert><p>Successfully added ${file.name}</p></div>`;
+  } catch (err) {
+    form.outerHTML = `<div class="uk-alert-danger" uk-alert><p>${err.message}</p></div>`;
+  }
+}
@@ -48,13 +48,6 @@ function encodeData(data) {
   return hexCodes.join("");
 }
 
-function decodeData(data) {
-  const bytes = Uint8Array.from(
-    data.match(/.{1,2}/g).map((byte) => parseInt(byte, 16)),
-  );
-  return bytes.buffer;
-}
-
 // {% if package is defined %}
 document.getElementById("share-button").addEventListener("click", () => {
   document.querySelector("#share-passphrase-ui").style.display = "block";
@@ -76,9 +69,14 @@ document
     const data = window.filedata;
     document.querySelector("#filename").value = window.filename;
     // {% endif %}
-    document.querySelector("#output-data").value = encodeData(
-      await encrypt(data, key),
+    // The encrypted result is sent as a file, rather than encoded as text.
+    const payload = new DataTransfer();
+    payload.items.add(
+      new File([await encrypt(data, key)], "share.bin", {
+        type: "application/octet-stream",
+      }),
     );
+    document.querySelector("#output-data").files = payload.files;
     document.querySelector("#checksum").value = encodeData(
       await crypto.subtle.digest("SHA-256", data),
     );
@@ -86,7 +84,8 @@ document
 // {% else %}
 document.querySelector("#view-results").addEventListener("click", async () => {
   const passphrase = document.querySelector("#share-passphrase").value;
-  const data = decodeData(document.querySelector("#data").value);
+  const response = await fetch(document.querySelector("#data-url").value);
+  const data = await response.arrayBuffer();
   const checksum = document.querySelector("#checksum").value;
   const output = document.querySelector("#output").value;
 